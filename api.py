@@ -1,25 +1,514 @@
-
 import re
-import io
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from PIL import Image
-import pytesseract
+import os
+import json
+import math
+import time
+import uuid
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import List
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import FastAPI, File, Request, UploadFile, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
 
+from metrics import (BULK_FALLBACKS, STAGE_SECONDS, Counter, Histogram, collect_stages, record_stage, record_stages,
+                     render, sample_lines, stage)
+from ocr_cache import OCRCache, make_key, make_file_key
+from ocr_engine import OCR_BULK_SIZE, ocr_source, ocr_source_layout, ocr_sources
+from ocr_layout import merge_layouts, scale_layout
+from perceptual_index import OCR_PHASH, PerceptualIndex, image_hashes
+from preprocessing import signature as preprocess_signature
+from text_index import SEARCH_MAX_LIMIT, open_text_index
+from tiling import image_size, join_tiles, should_tile, split_image, split_image_regions
+from video_ocr import ocr_video, signature as video_signature
+
+# Configuração do pool de OCR (pode ser ajustada por variáveis de ambiente)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", OCR_WORKERS * 4))
+OCR_RETRY_AFTER = int(os.getenv("OCR_RETRY_AFTER", 2))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 100))
+
+# Parte da chave do cache que descreve o pipeline (resultados mudam com o pré-processamento)
+OCR_CACHE_CONFIG = preprocess_signature()
+PHASH_NAMESPACE = f"por:{OCR_CACHE_CONFIG}"
+VIDEO_CACHE_CONFIG = f"{video_signature()}|{OCR_CACHE_CONFIG}"
+LAYOUT_CACHE_CONFIG = f"{OCR_CACHE_CONFIG}|layout"
+RESPONSE_FORMATS = ("text", "structured")
+# Coleção do índice de textos usada quando a requisição não informa uma
+DEFAULT_COLLECTION = "api"
+VIDEO_CONTENT_TYPES = ["video/mp4", "video/quicktime", "video/webm", "video/x-matroska"]
+
+# Configuração dos jobs em lote
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", Path(tempfile.gettempdir()) / "vx9_uploads"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 3600))
+OCR_SECONDS_PER_IMAGE = float(os.getenv("OCR_SECONDS_PER_IMAGE", 3))
+
+
+# Métricas da API (ver `metrics`; expostas em /metrics)
+POOL_REJECTED = Counter("vx9_ocr_rejected_total", "Submissões recusadas porque a fila de OCR estava cheia.")
+POOL_RESTARTS = Counter("vx9_ocr_pool_restarts_total", "Recriações do pool após a falha de um processo.")
+HTTP_SECONDS = Histogram("vx9_http_request_seconds", "Tempo das requisições até o início da resposta, por rota.", "path")
+
+
+class OCRPoolFullError(Exception):
+    """A fila de admissão do pool de OCR está cheia."""
+
+
+class OCRPoolUnavailableError(Exception):
+    """O pool de OCR não está disponível (não iniciado ou com processos quebrados)."""
+
+
+class OCRPool:
+    """
+    Pool de processos para OCR com fila de admissão limitada.
+
+    No máximo `workers` imagens são processadas em paralelo e até `queue_size`
+    aguardam na fila. Acima disso, novas submissões são rejeitadas imediatamente,
+    mantendo a latência previsível sob picos de carga.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = None
+        self._pending = 0
+        self._slot_freed = asyncio.Event()
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def queued(self) -> int:
+        return max(0, self._pending - self.workers)
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, fn, *args, wait: bool = False):
+        """
+        Executa `fn(*args)` em um processo do pool.
+
+        Levanta OCRPoolFullError se a fila estiver cheia (a menos que `wait` seja
+        verdadeiro, caso em que aguarda uma vaga) e OCRPoolUnavailableError se o
+        pool não estiver disponível.
+        """
+        if self._executor is None:
+            raise OCRPoolUnavailableError("Pool de OCR não iniciado.")
+        if self._pending >= self.capacity:
+            if not wait:
+                POOL_REJECTED.inc()
+                raise OCRPoolFullError("Fila de OCR cheia.")
+            while self._pending >= self.capacity:
+                self._slot_freed.clear()
+                await self._slot_freed.wait()
+
+        executor = self._executor
+        if executor is None:
+            raise OCRPoolUnavailableError("Pool de OCR não iniciado.")
+
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        try:
+            future = executor.submit(collect_stages, fn, *args)
+            # A vaga só é liberada quando o processo termina (ou a tarefa sai da fila sem
+            # começar), não quando esta corrotina sai: se a requisição for cancelada, o
+            # OCR já em andamento continua ocupando um processo do pool
+            self._pending += 1
+            future.add_done_callback(lambda _: self._release_soon(loop))
+            # As etapas medidas no processo do pool voltam com o resultado; o que
+            # sobra do tempo total é espera na fila e transferência entre processos
+            result, stages, elapsed = await asyncio.wrap_future(future)
+            record_stages(stages)
+            record_stage('pool_wait', max(0.0, time.perf_counter() - submitted - elapsed))
+            return result
+        except BrokenProcessPool as e:
+            # Um processo morreu (ex.: falta de memória); recria o pool para as próximas requisições
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                POOL_RESTARTS.inc()
+            raise OCRPoolUnavailableError("Pool de OCR reiniciado após falha de um processo.") from e
+
+    def _release_soon(self, loop):
+        # Chamado na thread do executor: a contagem só é alterada no event loop
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Event loop já encerrado (desligamento da API)
+            pass
+
+    def _release(self):
+        self._pending -= 1
+        self._slot_freed.set()
+
+
+ocr_pool = OCRPool(OCR_WORKERS, OCR_QUEUE_SIZE)
+
+# Jobs em lote e /extract-text/batch usam juntos no máximo `OCR_WORKERS` vagas do
+# pool ao mesmo tempo, deixando a fila livre para as requisições interativas de /extract-text
+batch_slots = asyncio.Semaphore(OCR_WORKERS)
+
+# Estado dos uploads e jobs em lote (mantido em memória; arquivos ficam em UPLOAD_DIR)
+uploads = {}
+jobs = {}
+_job_tasks = set()
+
+# Cache de resultados compartilhado com a aplicação desktop (criado no startup,
+# para que os processos do pool não abram o banco SQLite)
+ocr_cache = None
+# Índice de hashes perceptuais (slides repostados/recomprimidos); None com OCR_PHASH=0
+phash_index = None
+# Índice de texto completo dos resultados (ver `text_index`); None com TEXT_INDEX_DB=""
+text_index = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ocr_cache, phash_index, text_index
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    ocr_cache = OCRCache()
+    if OCR_PHASH:
+        phash_index = PerceptualIndex()
+    text_index = open_text_index()
+    ocr_pool.start()
+    try:
+        yield
+    finally:
+        for task in list(_job_tasks):
+            task.cancel()
+        ocr_pool.shutdown()
+        ocr_cache.close()
+        if phash_index is not None:
+            phash_index.close()
+        if text_index is not None:
+            text_index.close()
+
+
 # Inicializa a aplicação FastAPI
 app = FastAPI(
     title="API de Extração de Texto de Imagens",
     description="Uma API para extrair texto de imagens usando Tesseract OCR.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+@app.middleware("http")
+async def measure_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Rótulo pela rota (ex.: /ocr/status/{job_id}), não pela URL, para não criar uma série por job
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(time.perf_counter() - start, route.path if route is not None else "unmatched")
+    return response
+
 def clean_text(text: str) -> str:
     """
     Limpa o texto extraído, removendo espaços extras e caracteres não imprimíveis.
     """
-    text = re.sub(r'\s+', ' ', text)
-    text = ''.join(char for char in text if char.isprintable() or char == '\n')
-    return text.strip()
+    with stage('clean_text'):
+        text = re.sub(r'\s+', ' ', text)
+        text = ''.join(char for char in text if char.isprintable() or char == '\n')
+        return text.strip()
+
+def ocr_image_bytes(image_bytes: bytes, lang: str = 'por') -> str:
+    """
+    Executa o OCR sobre os bytes de uma imagem (ou um caminho) e retorna o texto limpo.
+
+    Roda dentro dos processos do pool, por isso precisa ser uma função de módulo.
+    O motor de OCR (ver `ocr_engine.get_engine`) fica aquecido em cada processo e
+    a imagem passa antes pelo pré-processamento (slides vazios nem chegam ao motor).
+    """
+    return clean_text(ocr_source(image_bytes, lang=lang))
+
+def ocr_image_layout(image_bytes: bytes, lang: str = 'por') -> dict:
+    """
+    Como `ocr_image_bytes`, mas retorna o resultado estruturado (palavras com caixa
+    e confiança, linhas e parágrafos; ver `ocr_layout`) da mesma execução do motor.
+    """
+    return ocr_source_layout(image_bytes, lang=lang)
+
+def ocr_image_files(paths: List[str], lang: str = 'por') -> List[dict]:
+    """
+    Executa o OCR de vários arquivos salvos em disco em uma única chamada ao motor
+    (usado pelos jobs em lote). Retorna, para cada arquivo, `text` ou `error`.
+    """
+    results = []
+    for result in ocr_sources(paths, lang=lang):
+        if isinstance(result, Exception):
+            results.append({"error": str(result)})
+        else:
+            results.append({"text": clean_text(result)})
+    return results
+
+def ocr_video_file(path: str, lang: str = 'por') -> dict:
+    """
+    Extrai os segmentos de texto de um vídeo (ver `video_ocr`). Roda dentro dos processos do pool.
+    """
+    result = ocr_video(path, lang=lang)
+    for segment in result['segments']:
+        segment['text'] = clean_text(segment['text'])
+    return result
+
+async def ocr_image(source, wait: bool = False) -> str:
+    """
+    Executa o OCR de uma imagem (bytes ou caminho) no pool.
+
+    Imagens muito altas são divididas em tiras com texto (ver `tiling`), que são
+    reconhecidas em paralelo em vários processos e reunidas em ordem de leitura.
+    """
+    size = image_size(source) if isinstance(source, bytes) else await asyncio.to_thread(image_size, source)
+    if not should_tile(size):
+        return await ocr_pool.submit(ocr_image_bytes, source, 'por', wait=wait)
+
+    tiles = await ocr_pool.submit(split_image, source, ocr_pool.workers, wait=wait)
+    # A imagem já foi admitida: as tiras aguardam vaga em vez de serem rejeitadas
+    texts = await asyncio.gather(*(ocr_pool.submit(ocr_image_bytes, tile, 'por', wait=True) for tile in tiles))
+    return clean_text(join_tiles(texts))
+
+async def ocr_image_structured(source, wait: bool = False) -> dict:
+    """
+    Versão estruturada de `ocr_image`. Nas imagens divididas em tiras, as caixas
+    de cada tira são levadas para as coordenadas da imagem inteira antes de juntar.
+    """
+    size = image_size(source) if isinstance(source, bytes) else await asyncio.to_thread(image_size, source)
+    if not should_tile(size):
+        layout = await ocr_pool.submit(ocr_image_layout, source, 'por', wait=wait)
+    else:
+        tiles, (factor_x, factor_y) = await ocr_pool.submit(split_image_regions, source, ocr_pool.workers, wait=wait)
+        layouts = await asyncio.gather(*(ocr_pool.submit(ocr_image_layout, tile, 'por', wait=True) for tile, _ in tiles))
+        layout = merge_layouts([
+            scale_layout(tile_layout, factor_x, factor_y, box[0], box[1])
+            for tile_layout, (_, box) in zip(layouts, tiles)
+        ])
+    layout['text'] = clean_text(layout['text'])
+    return layout
+
+def _safe_hashes(source):
+    """
+    Hashes perceptuais da imagem, ou None se ela não puder ser lida (o erro aparece no OCR).
+    """
+    try:
+        return image_hashes(source)
+    except Exception:
+        return None
+
+def _lookup_similar(hashes):
+    """
+    Texto de uma imagem quase idêntica já reconhecida, ou None.
+    """
+    if phash_index is None or hashes is None:
+        return None
+    similar = phash_index.lookup(hashes, PHASH_NAMESPACE)
+    return ocr_cache.get(similar) if similar is not None else None
+
+def _index_hashes(hashes, key: str):
+    if phash_index is not None and hashes is not None and key is not None:
+        phash_index.add(hashes, PHASH_NAMESPACE, key)
+
+async def ocr_image_dedup(image_bytes: bytes, key: str, wait: bool = False) -> str:
+    """
+    OCR de uma imagem ausente do cache exato. Antes de ocupar o pool, procura no
+    índice perceptual uma versão recomprimida/redimensionada da mesma imagem e
+    reaproveita o texto dela; caso contrário, reconhece e indexa a imagem.
+    """
+    if phash_index is None:
+        return await ocr_image(image_bytes, wait=wait)
+    hashes = await asyncio.to_thread(_safe_hashes, image_bytes)
+    text = await asyncio.to_thread(_lookup_similar, hashes)
+    if text is not None:
+        return text
+    text = await ocr_image(image_bytes, wait=wait)
+    await asyncio.to_thread(_index_hashes, hashes, key)
+    return text
+
+def _document_source(key: str) -> str:
+    """
+    Origem dos documentos enviados à API no índice de busca: o hash do conteúdo
+    (o início da chave do cache), não o nome do arquivo. Nomes como `image.jpg`
+    se repetem entre clientes e substituiriam o texto de outra imagem; a mesma
+    imagem reenviada, essa sim, substitui o próprio documento.
+    """
+    return f"sha256:{key.split(':', 1)[0]}"
+
+async def _index_texts(collection: str, entries: List[tuple]):
+    """
+    Grava os textos extraídos no índice de busca: (origem, posição, imagem, legenda, texto).
+    Uma falha no índice não derruba a requisição, cujo resultado já está pronto.
+    """
+    if text_index is None or not entries:
+        return
+    try:
+        await asyncio.to_thread(text_index.add_many, collection, entries)
+    except Exception:
+        pass
+
+async def _read_upload(file: UploadFile) -> bytes:
+    with stage('upload_read'):
+        return await file.read()
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:12]}"
+
+def _save_upload(source, destination: Path) -> int:
+    with open(destination, 'wb') as f:
+        shutil.copyfileobj(source, f, length=1024 * 1024)
+    return destination.stat().st_size
+
+def _purge_expired():
+    """
+    Remove uploads e jobs mais antigos que JOB_TTL_SECONDS, junto com seus arquivos.
+    """
+    cutoff = time.time() - JOB_TTL_SECONDS
+    for job_id in [j for j, job in jobs.items() if job['finished_at'] and job['finished_at'] < cutoff]:
+        del jobs[job_id]
+    active_uploads = {job['upload_id'] for job in jobs.values()}
+    for upload_id in [u for u, up in uploads.items() if up['created_at'] < cutoff and u not in active_uploads]:
+        shutil.rmtree(uploads.pop(upload_id)['dir'], ignore_errors=True)
+
+def _job_status(job: dict) -> str:
+    if job['completed'] < job['total']:
+        return 'processing'
+    if job['failed'] == job['total']:
+        return 'failed'
+    return 'completed_with_errors' if job['failed'] else 'completed'
+
+def _lookup_cached(paths: List[str]) -> List[tuple]:
+    """
+    Calcula a chave de cada arquivo e consulta o cache (exato e, na falta, o índice perceptual).
+    Retorna quádruplas (chave, texto ou None, se a imagem deve ser dividida em tiras, hashes perceptuais).
+    """
+    results = []
+    for path in paths:
+        try:
+            key = make_file_key(path, 'por', OCR_CACHE_CONFIG)
+            tall = should_tile(image_size(path))
+        except Exception:
+            # O erro aparece no OCR do arquivo, como falha daquele item
+            results.append((None, None, False, None))
+            continue
+        text = ocr_cache.get(key)
+        hashes = None
+        if text is None and phash_index is not None:
+            hashes = _safe_hashes(path)
+            text = _lookup_similar(hashes)
+        results.append((key, text, tall, hashes))
+    return results
+
+def _finish_job_file(job: dict, file_result: dict, text: str = None, error: str = None):
+    if error is None:
+        file_result['extractedText'] = text if text else "[Nenhum texto detectado]"
+        file_result['status'] = 'completed'
+    else:
+        file_result['error'] = f"Ocorreu um erro ao processar a imagem: {error}"
+        file_result['status'] = 'failed'
+        job['failed'] += 1
+    job['completed'] += 1
+
+async def _process_job_chunk(job: dict, chunk: List[tuple]):
+    """
+    Envia um grupo de arquivos ao pool como uma única tarefa (uma execução do motor).
+    """
+    async with batch_slots:
+        try:
+            results = await ocr_pool.submit(ocr_image_files, [path for _, path, _, _ in chunk], 'por', wait=True)
+        except Exception as e:
+            results = [{"error": str(e)}] * len(chunk)
+
+    for (file_result, _, key, hashes), result in zip(chunk, results):
+        if 'error' in result:
+            _finish_job_file(job, file_result, error=result['error'])
+        else:
+            if key is not None:
+                await asyncio.to_thread(ocr_cache.put, key, result['text'])
+                await asyncio.to_thread(_index_hashes, hashes, key)
+            _finish_job_file(job, file_result, text=result['text'])
+
+async def _process_job_tall_file(job: dict, file_result: dict, path: str, key: str, hashes):
+    async with batch_slots:
+        try:
+            text = await ocr_image(path, wait=True)
+        except Exception as e:
+            _finish_job_file(job, file_result, error=str(e))
+            return
+    await asyncio.to_thread(ocr_cache.put, key, text)
+    await asyncio.to_thread(_index_hashes, hashes, key)
+    _finish_job_file(job, file_result, text=text)
+
+async def _run_job(job_id: str, paths: List[str]):
+    job = jobs[job_id]
+    try:
+        # Arquivos já vistos saem do cache; imagens muito altas são divididas em tiras
+        # e as demais são agrupadas em lotes para o motor
+        cached = await asyncio.to_thread(_lookup_cached, paths)
+        missing = []
+        tall = []
+        sources = [_document_source(key) if key is not None else None for key, _, _, _ in cached]
+        for file_result, path, (key, text, is_tall, hashes) in zip(job['files'], paths, cached):
+            if text is not None:
+                _finish_job_file(job, file_result, text=text)
+            elif is_tall:
+                tall.append(_process_job_tall_file(job, file_result, path, key, hashes))
+            else:
+                missing.append((file_result, path, key, hashes))
+
+        chunks = [missing[i:i + OCR_BULK_SIZE] for i in range(0, len(missing), OCR_BULK_SIZE)]
+        # Espera todos os grupos antes de tratar uma falha, para que nenhum ainda
+        # esteja gravando resultados quando os arquivos restantes forem marcados
+        outcomes = await asyncio.gather(*tall, *(_process_job_chunk(job, chunk) for chunk in chunks),
+                                        return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise outcome
+
+        # O job inteiro vai para o índice de busca em uma única transação
+        await _index_texts(job['collection'], [
+            (source, order, file_result['filename'], '', file_result['extractedText'])
+            for order, (file_result, source) in enumerate(zip(job['files'], sources), start=1)
+            if source is not None and file_result['status'] == 'completed'
+            and file_result['extractedText'] != "[Nenhum texto detectado]"
+        ])
+    except Exception as e:
+        # Erro fora do tratamento de cada arquivo (ex.: cache SQLite): sem isso, os
+        # arquivos ainda não concluídos ficariam "processing" para sempre
+        for file_result in job['files']:
+            if file_result['status'] == 'processing':
+                _finish_job_file(job, file_result, error=str(e))
+    finally:
+        job['finished_at'] = time.time()
+
+async def _extract_structured(image_bytes: bytes, key: str) -> dict:
+    """
+    Resultado estruturado de /extract-text, em cache como JSON sob `key`. O texto
+    limpo também vai para a chave do formato `text`, que passa a sair do cache.
+    O índice perceptual não é usado aqui: as caixas valem só para a imagem exata.
+    """
+
+    async def compute():
+        layout = await ocr_image_structured(image_bytes)
+        await asyncio.to_thread(ocr_cache.put, make_key(image_bytes, 'por', OCR_CACHE_CONFIG), layout['text'])
+        return json.dumps(layout, ensure_ascii=False)
+
+    layout = json.loads(await ocr_cache.aget_or_compute(key, compute))
+    if not layout['text']:
+        layout['text'] = "[Nenhum texto detectado]"
+    return layout
 
 @app.get("/", tags=["Root"])
 async def read_root():
@@ -29,42 +518,417 @@ async def read_root():
     return {"message": "Bem-vindo à API de Extração de Texto. Use o endpoint /extract-text para enviar uma imagem."}
 
 @app.post("/extract-text", tags=["OCR"])
-async def extract_text_from_image(file: UploadFile = File(...)):
+async def extract_text_from_image(file: UploadFile = File(...), format: str = "text",
+                                  collection: str = DEFAULT_COLLECTION):
     """
     Recebe um arquivo de imagem, extrai o texto usando OCR e o retorna.
 
     - **file**: O arquivo de imagem a ser processado (formatos suportados: PNG, JPG, JPEG).
+    - **format**: `text` (padrão) retorna só o texto; `structured` acrescenta a
+      confiança média (0 a 1) e os parágrafos, linhas e palavras com suas caixas
+      `[x, y, largura, altura]`, obtidos na mesma execução do OCR.
+    - **collection**: Coleção em que o texto é indexado para busca (ver /search).
+
+    Retorna 429 quando a fila de OCR está cheia e 503 quando o pool está indisponível.
     """
     # Validação do tipo de arquivo
     if file.content_type not in ["image/png", "image/jpeg"]:
         raise HTTPException(status_code=400, detail="Tipo de arquivo inválido. Por favor, envie uma imagem PNG ou JPG.")
+    if format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use 'text' ou 'structured'.")
+
+    # Rejeita cedo, antes de ler o upload, se não houver espaço na fila
+    if ocr_pool.pending >= ocr_pool.capacity:
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(OCR_RETRY_AFTER)}
+        )
 
     try:
         # Lê o conteúdo do arquivo em memória
-        image_bytes = await file.read()
-        
-        # Abre a imagem usando Pillow
-        img = Image.open(io.BytesIO(image_bytes))
+        image_bytes = await _read_upload(file)
 
-        # Converte para RGB se necessário (melhora a compatibilidade com Tesseract)
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
+        if format == "structured":
+            key = make_key(image_bytes, 'por', LAYOUT_CACHE_CONFIG)
+            layout = await _extract_structured(image_bytes, key)
+            if layout['text'] != "[Nenhum texto detectado]":
+                await _index_texts(collection, [(_document_source(key), 1, file.filename, '', layout['text'])])
+            return {"filename": file.filename, **layout}
 
-        # Extrai o texto usando Tesseract OCR para o idioma português
-        extracted_text = pytesseract.image_to_string(img, lang='por')
-        
-        # Limpa o texto extraído
-        cleaned_text = clean_text(extracted_text)
+        # Executa o OCR em um processo separado, sem bloquear o event loop,
+        # reaproveitando o resultado de imagens idênticas já processadas
+        # e de versões quase idênticas delas (ver `perceptual_index`)
+        key = make_key(image_bytes, 'por', OCR_CACHE_CONFIG)
+        cleaned_text = await ocr_cache.aget_or_compute(key, lambda: ocr_image_dedup(image_bytes, key))
+        await _index_texts(collection, [(_document_source(key), 1, file.filename, '', cleaned_text)])
 
         return {
             "filename": file.filename,
             "text": cleaned_text if cleaned_text else "[Nenhum texto detectado]"
         }
 
+    except OCRPoolFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(OCR_RETRY_AFTER)}
+        )
+    except OCRPoolUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Serviço de OCR indisponível: {str(e)}",
+            headers={"Retry-After": str(OCR_RETRY_AFTER)}
+        )
     except Exception as e:
         # Captura exceções genéricas durante o processamento
         raise HTTPException(status_code=500, detail=f"Ocorreu um erro ao processar a imagem: {str(e)}")
 
+@app.post("/extract-text/video", tags=["OCR"])
+async def extract_text_from_video(file: UploadFile = File(...)):
+    """
+    Recebe um vídeo (ex.: TikTok, Reels) e extrai o texto queimado nos quadros.
+
+    - **file**: O vídeo a ser processado (MP4, MOV, WebM, MKV).
+
+    Os quadros são amostrados e só os que mudam de texto passam pelo OCR.
+    Retorna os segmentos `{start, end, text}` (em segundos), sem repetições.
+    """
+    if file.content_type not in VIDEO_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Tipo de arquivo inválido. Por favor, envie um vídeo MP4, MOV, WebM ou MKV.")
+
+    if ocr_pool.pending >= ocr_pool.capacity:
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(OCR_RETRY_AFTER)}
+        )
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    path = UPLOAD_DIR / _new_id('vid')
+    try:
+        await asyncio.to_thread(_save_upload, file.file, path)
+        key = await asyncio.to_thread(make_file_key, path, 'por', VIDEO_CACHE_CONFIG)
+
+        async def compute():
+            return json.dumps(await ocr_pool.submit(ocr_video_file, str(path), 'por'), ensure_ascii=False)
+
+        result = json.loads(await ocr_cache.aget_or_compute(key, compute))
+        return {"filename": file.filename, **result}
+
+    except OCRPoolFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(OCR_RETRY_AFTER)}
+        )
+    except OCRPoolUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Serviço de OCR indisponível: {str(e)}",
+            headers={"Retry-After": str(OCR_RETRY_AFTER)}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ocorreu um erro ao processar o vídeo: {str(e)}")
+    finally:
+        path.unlink(missing_ok=True)
+
+@app.post("/extract-text/batch", tags=["OCR"])
+async def extract_text_from_images(files: List[UploadFile] = File(...), collection: str = DEFAULT_COLLECTION):
+    """
+    Recebe várias imagens, processa até `OCR_WORKERS` delas em paralelo (vagas
+    compartilhadas com os jobs em lote) e transmite os resultados como NDJSON
+    (uma linha JSON por imagem), na ordem em que ficam prontos.
+
+    - **files**: As imagens a serem processadas (PNG, JPG, JPEG).
+    - **collection**: Coleção em que os textos são indexados para busca (ver /search).
+
+    Cada linha contém `filename`, `index` (posição no envio), `text` (ou `error`),
+    `ocr_ms` (tempo da imagem, incluindo espera na fila) e `elapsed_ms` (desde o início do lote).
+    """
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Envie no máximo {BATCH_MAX_FILES} imagens por lote.")
+    invalid = [f.filename for f in files if f.content_type not in ["image/png", "image/jpeg"]]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Tipo de arquivo inválido: {', '.join(invalid)}. Envie imagens PNG ou JPG.")
+
+    # Rejeita cedo se o pool já estiver saturado; depois de admitido, o lote aguarda vagas
+    if ocr_pool.pending >= ocr_pool.capacity:
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(OCR_RETRY_AFTER)}
+        )
+
+    # Lê tudo antes de responder: os uploads são fechados ao fim do handler
+    contents = [(index, file.filename, await _read_upload(file)) for index, file in enumerate(files)]
+    batch_start = time.perf_counter()
+
+    async def process(index: int, filename: str, image_bytes: bytes) -> dict:
+        start = time.perf_counter()
+        result = {"filename": filename, "index": index}
+        try:
+            key = make_key(image_bytes, 'por', OCR_CACHE_CONFIG)
+
+            async def compute():
+                # Como os jobs, o lote ocupa no máximo `batch_slots` vagas do pool: a fila
+                # continua livre para /extract-text mesmo durante um lote de 100 imagens
+                async with batch_slots:
+                    return await ocr_image_dedup(image_bytes, key, wait=True)
+
+            text = await ocr_cache.aget_or_compute(key, compute)
+            result["text"] = text if text else "[Nenhum texto detectado]"
+            await _index_texts(collection, [(_document_source(key), index + 1, filename, '', text)])
+        except Exception as e:
+            result["error"] = f"Ocorreu um erro ao processar a imagem: {str(e)}"
+        end = time.perf_counter()
+        result["ocr_ms"] = round((end - start) * 1000, 1)
+        result["elapsed_ms"] = round((end - batch_start) * 1000, 1)
+        return result
+
+    async def stream():
+        tasks = [asyncio.create_task(process(*item)) for item in contents]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+        finally:
+            # Cliente desconectou: cancela as imagens que ainda não começaram
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/cache/stats", tags=["Cache"])
+async def cache_stats():
+    """
+    Retorna os contadores do cache de OCR (acertos em memória/disco, falhas, agrupamentos)
+    e do índice perceptual de imagens quase idênticas.
+    """
+    stats = ocr_cache.stats()
+    stats["perceptual"] = phash_index.stats() if phash_index is not None else None
+    return stats
+
+@app.get("/metrics", tags=["Métricas"], response_class=PlainTextResponse)
+async def read_metrics():
+    """
+    Métricas no formato de texto do Prometheus: histogramas de tempo por etapa
+    do OCR (`vx9_ocr_stage_seconds`) e por rota, ocupação da fila do pool, lotes
+    refeitos imagem a imagem e contadores do cache e do índice perceptual.
+    """
+    sections = [
+        STAGE_SECONDS.render(),
+        HTTP_SECONDS.render(),
+        sample_lines("vx9_ocr_pool_workers", "Processos do pool de OCR.", "gauge", ocr_pool.workers),
+        sample_lines("vx9_ocr_pool_capacity", "Imagens em processamento mais vagas na fila.", "gauge", ocr_pool.capacity),
+        sample_lines("vx9_ocr_pool_pending", "Tarefas no pool (em processamento e na fila).", "gauge", ocr_pool.pending),
+        sample_lines("vx9_ocr_pool_queued", "Tarefas aguardando um processo livre.", "gauge", ocr_pool.queued),
+        POOL_REJECTED.render(),
+        POOL_RESTARTS.render(),
+        BULK_FALLBACKS.render(),
+        sample_lines("vx9_jobs_active", "Jobs em lote em andamento.", "gauge", len(_job_tasks)),
+    ]
+    cache = ocr_cache.stats()
+    sections += [
+        sample_lines("vx9_ocr_cache_hits_total", "Acertos do cache de OCR, por nível.", "counter",
+                     {"memory": cache["hits_memory"], "disk": cache["hits_disk"]}, "tier"),
+        sample_lines("vx9_ocr_cache_misses_total", "Falhas do cache de OCR.", "counter", cache["misses"]),
+        sample_lines("vx9_ocr_cache_coalesced_total", "Requisições que aguardaram um OCR idêntico em andamento.",
+                     "counter", cache["coalesced"]),
+        sample_lines("vx9_ocr_cache_memory_bytes", "Memória ocupada pelo cache de OCR.", "gauge", cache["memory_bytes"]),
+        sample_lines("vx9_ocr_cache_memory_entries", "Entradas no cache de OCR em memória.", "gauge", cache["memory_entries"]),
+    ]
+    if phash_index is not None:
+        perceptual = phash_index.stats()
+        sections += [
+            sample_lines("vx9_phash_hits_total", "Imagens quase idênticas encontradas no índice perceptual.",
+                         "counter", perceptual["hits"]),
+            sample_lines("vx9_phash_misses_total", "Consultas ao índice perceptual sem imagem parecida.",
+                         "counter", perceptual["misses"]),
+            sample_lines("vx9_phash_entries", "Imagens no índice perceptual.", "gauge", perceptual["entries"]),
+        ]
+    return PlainTextResponse(render(sections), media_type="text/plain; version=0.0.4")
+
+class ProcessRequest(BaseModel):
+    uploadId: str
+    fileIds: List[str]
+    collection: str = DEFAULT_COLLECTION
+
+@app.post("/ocr/upload", tags=["OCR em Lote"])
+async def upload_images(files: List[UploadFile] = File(...)):
+    """
+    Recebe várias imagens e as armazena para processamento posterior.
+
+    - **files**: As imagens a serem enviadas (PNG, JPG, JPEG).
+
+    Retorna o `uploadId` e um `fileId` para cada arquivo, a serem usados em /ocr/process.
+    """
+    invalid = [f.filename for f in files if f.content_type not in ["image/png", "image/jpeg"]]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Tipo de arquivo inválido: {', '.join(invalid)}. Envie imagens PNG ou JPG.")
+
+    _purge_expired()
+
+    upload_id = _new_id('upl')
+    upload_dir = UPLOAD_DIR / upload_id
+    upload_dir.mkdir(parents=True, exist_ok=True)
+
+    uploaded_files = []
+    stored = {}
+    for file in files:
+        file_id = _new_id('file')
+        path = upload_dir / file_id
+        size = await asyncio.to_thread(_save_upload, file.file, path)
+        stored[file_id] = {'filename': file.filename, 'path': str(path)}
+        uploaded_files.append({
+            "fileId": file_id,
+            "filename": file.filename,
+            "size": size,
+            "status": "uploaded"
+        })
+
+    uploads[upload_id] = {'dir': str(upload_dir), 'files': stored, 'created_at': time.time()}
+
+    return {
+        "success": True,
+        "data": {
+            "uploadId": upload_id,
+            "files": uploaded_files,
+            "totalFiles": len(uploaded_files)
+        },
+        "message": "Arquivos enviados com sucesso"
+    }
+
+@app.post("/ocr/process", tags=["OCR em Lote"])
+async def process_ocr(request: ProcessRequest):
+    """
+    Inicia, em segundo plano, o OCR dos arquivos de um upload.
+
+    - **uploadId**: O identificador retornado por /ocr/upload.
+    - **fileIds**: Os arquivos do upload a serem processados.
+    - **collection**: Coleção em que os textos são indexados para busca (padrão: `api`).
+
+    Acompanhe o andamento com /ocr/status/{jobId}.
+    """
+    upload = uploads.get(request.uploadId)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload não encontrado ou expirado.")
+    unknown = [file_id for file_id in request.fileIds if file_id not in upload['files']]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Arquivos não encontrados no upload: {', '.join(unknown)}")
+    if not request.fileIds:
+        raise HTTPException(status_code=400, detail="Nenhum arquivo informado.")
+
+    job_id = _new_id('job')
+    total = len(request.fileIds)
+    jobs[job_id] = {
+        'upload_id': request.uploadId,
+        'collection': request.collection,
+        'total': total,
+        'completed': 0,
+        'failed': 0,
+        'finished_at': None,
+        'files': [
+            {
+                "fileId": file_id,
+                "filename": upload['files'][file_id]['filename'],
+                "status": "processing",
+                "extractedText": None
+            }
+            for file_id in request.fileIds
+        ]
+    }
+
+    paths = [upload['files'][file_id]['path'] for file_id in request.fileIds]
+    task = asyncio.create_task(_run_job(job_id, paths))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+
+    return {
+        "success": True,
+        "data": {
+            "jobId": job_id,
+            "status": "processing",
+            "totalFiles": total,
+            "estimatedTime": math.ceil(total * OCR_SECONDS_PER_IMAGE / ocr_pool.workers)
+        },
+        "message": "Processamento iniciado"
+    }
+
+@app.get("/ocr/status/{job_id}", tags=["OCR em Lote"])
+async def check_status(job_id: str, include_files: bool = True):
+    """
+    Retorna o progresso de um job e os resultados dos arquivos já concluídos.
+
+    - **include_files**: Use `false` para consultar apenas o progresso (mais barato em jobs grandes).
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado.")
+
+    return {
+        "success": True,
+        "data": {
+            "jobId": job_id,
+            "status": _job_status(job),
+            "progress": {
+                "completed": job['completed'],
+                "total": job['total'],
+                "percentage": round(job['completed'] / job['total'] * 100)
+            },
+            "files": job['files'] if include_files else []
+        }
+    }
+
+def _require_text_index():
+    if text_index is None:
+        raise HTTPException(status_code=503, detail="Índice de textos desativado (TEXT_INDEX_DB vazio).")
+    return text_index
+
+@app.get("/search", tags=["Busca"])
+async def search_texts(q: str, collection: str = None, limit: int = 20, offset: int = 0):
+    """
+    Busca nos textos e legendas já extraídos (API e aplicação desktop), do mais ao menos relevante.
+
+    - **q**: Palavras que devem aparecer (sem acentos ou maiúsculas obrigatórios);
+      use "aspas" para frases exatas e `palavra*` para buscar por prefixo.
+    - **collection**: Restringe a busca a uma coleção.
+    - **limit** / **offset**: Paginação (no máximo 100 resultados por página).
+
+    Cada resultado traz a origem, a posição no carrossel e um trecho com os termos em `<mark>`.
+    """
+    index = _require_text_index()
+    if limit < 1 or limit > SEARCH_MAX_LIMIT or offset < 0:
+        raise HTTPException(status_code=400, detail=f"Use limit entre 1 e {SEARCH_MAX_LIMIT} e offset >= 0.")
+    try:
+        result = await asyncio.to_thread(index.search, q, collection, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": {"query": q, "offset": offset, **result}}
+
+@app.get("/documents", tags=["Busca"])
+async def list_documents(collection: str = None, limit: int = 50, cursor: int = None):
+    """
+    Lista os textos indexados, do mais recente ao mais antigo.
+
+    - **collection**: Restringe a listagem a uma coleção.
+    - **limit**: Documentos por página (no máximo 100).
+    - **cursor**: O `nextCursor` da página anterior (ausente na primeira página).
+    """
+    index = _require_text_index()
+    if limit < 1 or limit > SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Use limit entre 1 e {SEARCH_MAX_LIMIT}.")
+    result = await asyncio.to_thread(index.list_documents, collection, limit, cursor)
+    return {"success": True, "data": result}
+
+@app.get("/collections", tags=["Busca"])
+async def list_collections():
+    """
+    Lista as coleções do índice, com o número de documentos e a data da última atualização.
+    """
+    index = _require_text_index()
+    return {"success": True, "data": {"collections": await asyncio.to_thread(index.collections)}}
+
 if __name__ == "__main__":
     # Comando para rodar a API: uvicorn api:app --reload
+    # Tamanho do pool: OCR_WORKERS (padrão: nº de CPUs); fila: OCR_QUEUE_SIZE (padrão: 4x workers)
     uvicorn.run(app, host="0.0.0.0", port=8000)
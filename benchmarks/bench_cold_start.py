@@ -0,0 +1,113 @@
+"""
+Mede o tempo de inicialização a frio da aplicação desktop (interface e modo headless).
+
+Cada medição é um novo processo Python, então inclui o custo de todos os imports.
+
+- CLI: `carousel_text_extractor.py --help` (importa o módulo e interpreta os argumentos);
+- GUI (imports): importa o módulo e os módulos da interface (tkinter, ImageTk), sem abrir janela;
+- GUI: importa o módulo, abre a janela, processa o primeiro ciclo de eventos e fecha.
+  Requer um display: sem `DISPLAY`, o script sobe um Xvfb próprio se ele estiver
+  instalado; caso contrário a medição é ignorada.
+
+Uso:
+    python benchmarks/bench_cold_start.py --repeat 10
+    python benchmarks/bench_cold_start.py --importtime   # os imports mais caros
+"""
+
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUI_IMPORTS_SNIPPET = "import carousel_text_extractor as c; c._load_gui_modules()"
+
+GUI_SNIPPET = (
+    "import carousel_text_extractor as c; c._load_gui_modules(); "
+    "root = c.tk.Tk(); c.CarouselTextExtractor(root); root.update(); root.destroy()"
+)
+
+
+def start_xvfb():
+    """
+    Sobe um Xvfb em um display livre, se não houver `DISPLAY` e o Xvfb estiver instalado.
+    Retorna (processo, ambiente com o `DISPLAY`), ou (None, None).
+    """
+    if os.environ.get('DISPLAY') or not shutil.which('Xvfb'):
+        return None, None
+    for number in range(99, 120):
+        if os.path.exists(f'/tmp/.X11-unix/X{number}'):
+            continue
+        proc = subprocess.Popen(['Xvfb', f':{number}', '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f'/tmp/.X11-unix/X{number}'):
+                return proc, dict(os.environ, DISPLAY=f':{number}')
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+        proc.kill()
+    return None, None
+
+
+def measure(cmd, repeat, env=None):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, env=env)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            return None, proc.stderr.decode(errors='replace').strip().splitlines()[-1:]
+        times.append(elapsed * 1000)
+    return times, None
+
+
+def report(label, times, error):
+    if times is None:
+        print(f"{label:<14} indisponível: {' '.join(error)}")
+        return
+    print(f"{label:<14} mediana {statistics.median(times):7.1f} ms   mín {min(times):7.1f} ms   máx {max(times):7.1f} ms")
+
+
+def importtime(top):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import carousel_text_extractor'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(.+)', line)
+        if match:
+            rows.append((int(match.group(2)), match.group(3).strip()))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--importtime', action='store_true', help="lista os imports mais caros do módulo")
+    args = parser.parse_args()
+
+    if args.importtime:
+        importtime(15)
+        return
+
+    report('CLI', *measure([sys.executable, 'carousel_text_extractor.py', '--help'], args.repeat))
+    report('GUI (imports)', *measure([sys.executable, '-c', GUI_IMPORTS_SNIPPET], args.repeat))
+    xvfb, env = start_xvfb()
+    try:
+        report('GUI', *measure([sys.executable, '-c', GUI_SNIPPET], args.repeat, env))
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+
+if __name__ == '__main__':
+    main()
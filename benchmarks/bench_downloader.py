@@ -0,0 +1,172 @@
+"""
+Exercita o `downloader` contra um servidor HTTP local, sem depender do Instagram ou do TikTok.
+
+Sobe um `http.server` em 127.0.0.1 que serve `--images` imagens com `--latency-ms`
+de atraso por resposta; a primeira consulta de uma delas responde 503 (para
+exercitar as novas tentativas) e uma URL inexistente responde 404. O OCR é
+simulado por uma espera de `--ocr-ms`, para medir só o encadeamento.
+
+Compara:
+- sequencial: baixa uma imagem por vez e só depois faz o OCR de todas (o fluxo antigo);
+- encadeado: `download_and_process`, com downloads paralelos e OCR assim que cada imagem chega.
+
+Para cada um, reporta o tempo até o primeiro texto e o tempo total. Também
+confere que os arquivos gravados são idênticos aos servidos, que o 503 foi
+superado com uma nova tentativa e que o 404 chegou como erro daquele item;
+o script termina com código 1 se alguma verificação falhar.
+
+Uso:
+    python benchmarks/bench_downloader.py
+    python benchmarks/bench_downloader.py --images 20 --latency-ms 150 --ocr-ms 300 --workers 4
+"""
+
+import argparse
+import functools
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import downloader
+
+
+class SlowHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Serve os arquivos da pasta com um atraso fixo; `fail_once` responde 503 na primeira consulta.
+    """
+
+    latency = 0.0
+    fail_once = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        with self.lock:
+            fail = self.path in self.fail_once
+            self.fail_once.discard(self.path)
+        if fail:
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+def start_server(folder: str, latency: float, fail_once):
+    handler = type('Handler', (SlowHandler,), {'latency': latency, 'fail_once': set(fail_once)})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(handler, directory=folder))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_sequential(jobs, ocr):
+    start = time.perf_counter()
+    session = downloader.create_session(1)
+    for url, destination in jobs:
+        try:
+            downloader.download_file(url, destination, session=session)
+        except Exception:
+            pass
+    first = None
+    for _, destination in jobs:
+        if os.path.exists(destination):
+            ocr(destination)
+            if first is None:
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def run_pipelined(jobs, ocr, workers: int):
+    start = time.perf_counter()
+    results = {}
+    first = []
+    lock = threading.Lock()
+
+    def on_result(idx, path, result):
+        with lock:
+            results[idx] = result
+            if not first and not isinstance(result, Exception):
+                first.append(time.perf_counter() - start)
+
+    downloader.download_and_process(jobs, ocr, on_result, download_workers=workers, process_workers=workers,
+                                    session=downloader.create_session(workers))
+    return (first[0] if first else None), time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=10)
+    parser.add_argument('--size-kb', type=int, default=200, help="tamanho de cada imagem servida")
+    parser.add_argument('--latency-ms', type=float, default=100, help="atraso de cada resposta do servidor")
+    parser.add_argument('--ocr-ms', type=float, default=200, help="duração simulada do OCR de cada imagem")
+    parser.add_argument('--workers', type=int, default=downloader.DOWNLOAD_WORKERS)
+    args = parser.parse_args()
+
+    def ocr(path):
+        time.sleep(args.ocr_ms / 1000)
+        return os.path.basename(path)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as served, tempfile.TemporaryDirectory() as out:
+        payloads = {}
+        for idx in range(args.images):
+            name = f"{idx + 1}.jpg"
+            payloads[name] = os.urandom(args.size_kb * 1024)
+            with open(os.path.join(served, name), 'wb') as f:
+                f.write(payloads[name])
+
+        retried = f"/{args.images}.jpg"
+        names = list(payloads) + ['inexistente.jpg']
+        print(f"{args.images} imagens de {args.size_kb} KB, {args.latency_ms:.0f} ms por resposta, "
+              f"OCR simulado de {args.ocr_ms:.0f} ms, {args.workers} em paralelo")
+        print(f"{'modo':<12}{'primeiro texto':>16}{'total':>10}")
+
+        for mode in ('sequencial', 'encadeado'):
+            server = start_server(served, args.latency_ms / 1000, [retried])
+            base = f"http://127.0.0.1:{server.server_port}"
+            folder = os.path.join(out, mode)
+            os.makedirs(folder)
+            jobs = [(f"{base}/{name}", os.path.join(folder, name)) for name in names]
+            try:
+                if mode == 'sequencial':
+                    first, total = run_sequential(jobs, ocr)
+                    results = None
+                else:
+                    first, total, results = run_pipelined(jobs, ocr, args.workers)
+            finally:
+                server.shutdown()
+            if server.RequestHandlerClass.func.fail_once:
+                failures.append(f"{mode}: o 503 de {retried} não foi servido")
+            print(f"{mode:<12}{first * 1000:>13.0f} ms{total * 1000:>7.0f} ms")
+
+            for name, payload in payloads.items():
+                path = os.path.join(folder, name)
+                if not os.path.exists(path):
+                    failures.append(f"{mode}: {name} não foi baixado")
+                elif open(path, 'rb').read() != payload:
+                    failures.append(f"{mode}: {name} difere do arquivo servido")
+            if any(entry.endswith('.part') for entry in os.listdir(folder)):
+                failures.append(f"{mode}: sobrou um arquivo .part")
+            if results is not None:
+                missing = results.get(len(names) - 1)
+                if not isinstance(missing, Exception):
+                    failures.append("encadeado: a URL inexistente não chegou como erro")
+                ok = [idx for idx, result in results.items() if not isinstance(result, Exception)]
+                if len(ok) != args.images:
+                    failures.append(f"encadeado: {len(ok)} de {args.images} imagens processadas")
+
+    for failure in failures:
+        print(f"FALHA {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark da entrega da imagem ao Tesseract: caminho antigo vs. caminho direto.
+
+Caminho antigo: Image.open → convert('RGB') → pytesseract (regrava PNG temporário).
+Caminho novo:   bytes originais pela entrada padrão (ou PNM sem compressão).
+
+Uso:
+    python benchmarks/bench_ocr_handoff.py --sizes 1080x1350 2160x2700 --repeat 5
+    python benchmarks/bench_ocr_handoff.py --handoff-only   # não executa o Tesseract
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract
+from PIL import Image, ImageDraw
+
+from ocr_engine import image_to_text, sniff_format, to_pnm
+
+SAMPLE_LINES = [
+    "Extração de texto em carrosséis",
+    "Atenção: promoção válida até sexta-feira",
+    "Ação, coração, não, você, está",
+]
+
+
+def make_image(width: int, height: int, fmt: str) -> bytes:
+    img = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(img)
+    y = height // 10
+    for line in SAMPLE_LINES * 3:
+        draw.text((width // 10, y), line, fill='black')
+        y += max(20, height // 20)
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def legacy_handoff(data: bytes):
+    """Reproduz o que pytesseract faz antes de iniciar o tesseract."""
+    img = Image.open(io.BytesIO(data))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=True) as f:
+        img.save(f.name, format='PNG')
+
+
+def direct_handoff(data: bytes):
+    if sniff_format(data[:16]):
+        return data
+    with Image.open(io.BytesIO(data)) as img:
+        return to_pnm(img)
+
+
+def legacy_ocr(data: bytes):
+    img = Image.open(io.BytesIO(data))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return pytesseract.image_to_string(img, lang='por')
+
+
+def direct_ocr(data: bytes):
+    return image_to_text(data, lang='por')
+
+
+def measure(fn, data: bytes, repeat: int):
+    times = []
+    peaks = []
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(times) * 1000, max(peaks) / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['1080x1350', '2160x2700'])
+    parser.add_argument('--formats', nargs='+', default=['PNG', 'JPEG', 'WEBP'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--handoff-only', action='store_true', help="mede só a preparação, sem executar o Tesseract")
+    args = parser.parse_args()
+
+    legacy, direct = (legacy_handoff, direct_handoff) if args.handoff_only else (legacy_ocr, direct_ocr)
+
+    print(f"{'imagem':<18}{'antigo ms':>11}{'novo ms':>10}{'ganho ms':>10}{'antigo MiB':>12}{'novo MiB':>10}")
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split('x'))
+        for fmt in args.formats:
+            data = make_image(width, height, fmt)
+            old_ms, old_mib = measure(legacy, data, args.repeat)
+            new_ms, new_mib = measure(direct, data, args.repeat)
+            print(f"{size + ' ' + fmt:<18}{old_ms:>11.1f}{new_ms:>10.1f}{old_ms - new_ms:>10.1f}{old_mib:>12.1f}{new_mib:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
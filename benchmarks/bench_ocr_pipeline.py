@@ -0,0 +1,297 @@
+"""
+Benchmark de ponta a ponta do OCR com imagens sintéticas de texto em português.
+
+Gera slides com frases em português (acentos, cedilha, til) em vários tamanhos,
+todos diferentes entre si para que nenhum cache acerte, e mede:
+
+- desktop: o pipeline da aplicação desktop (`OCRRunner.ocr_paths`) neste
+  processo, em lotes de `--batch-sizes` imagens com `--workers` threads, sem
+  cache de OCR, índice perceptual ou índice de busca;
+- api: uma API já em execução (`--url`), com `--workers` requisições simultâneas
+  a /extract-text (lote 1) ou a /extract-text/batch (lotes maiores).
+
+Para cada tamanho e lote, reporta imagens/s e a latência p50/p99 de cada
+imagem (o tempo da chamada em que ela foi), além do tempo médio por etapa (ver
+`metrics`; no modo api, lido de /metrics). O p99 só é calculado com pelo menos
+`MIN_P99_SAMPLES` imagens na combinação (o padrão de `--images`); com menos,
+seria apenas o máximo.
+
+As imagens saem de uma semente fixa (`--seed`), então duas execuções medem as
+mesmas imagens. No modo api, cada execução ainda escreve um identificador
+aleatório nos slides, para que o cache da API não reaproveite a execução anterior.
+
+Teste de regressão: `--save` grava os resultados em JSON e `--baseline` compara
+com um JSON anterior; o script termina com código 1 se a vazão cair ou o p99
+(o p50, sem amostras para o p99) subir mais que `--tolerance` em alguma combinação.
+
+Uso:
+    python benchmarks/bench_ocr_pipeline.py --mode desktop --save base.json
+    python benchmarks/bench_ocr_pipeline.py --mode desktop --baseline base.json --tolerance 0.15
+    python benchmarks/bench_ocr_pipeline.py --mode api --url http://127.0.0.1:8000 --workers 8
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cada imagem deve passar pelo OCR: nada de cache ou índices persistentes no modo desktop
+os.environ["OCR_CACHE_DB"] = ""
+os.environ["OCR_PHASH"] = "0"
+os.environ["TEXT_INDEX_DB"] = ""
+
+from PIL import Image, ImageDraw, ImageFont
+
+SAMPLE_LINES = [
+    "Extração de texto em carrosséis",
+    "Atenção: promoção válida até sexta-feira",
+    "Ação, coração, não, você, está",
+    "Informações sobre o lançamento da coleção",
+    "Descontos de até 50% em calçados e acessórios",
+    "Inscrições abertas para o próximo módulo",
+    "Conheça a história por trás da nossa missão",
+    "Envio grátis para todo o Brasil nesta semana",
+]
+
+# Abaixo disso o p99 é só o maior valor medido
+MIN_P99_SAMPLES = 100
+
+FONT_CANDIDATES = ("DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "arial.ttf")
+
+
+def load_font(size: int):
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1: fonte bitmap de tamanho fixo
+        return ImageFont.load_default()
+
+
+def make_image(width: int, height: int, rng: random.Random, number: int, tag: str = '') -> bytes:
+    """
+    Slide com linhas de texto em português, como um post de carrossel, em PNG.
+    O número da imagem (e `tag`, se houver) entra no texto, então não há duas imagens iguais.
+    """
+    font_size = max(18, width // 22)
+    font = load_font(font_size)
+    background = rng.choice([(255, 255, 255), (245, 240, 230), (20, 24, 38)])
+    color = (20, 20, 20) if sum(background) > 384 else (250, 250, 250)
+    img = Image.new('RGB', (width, height), background)
+    draw = ImageDraw.Draw(img)
+    y = height // 12
+    draw.text((width // 12, y), f"Slide {number} {tag}".strip(), fill=color, font=font)
+    y += font_size * 2
+    while y < height - height // 12 - font_size:
+        draw.text((width // 12, y), rng.choice(SAMPLE_LINES), fill=color, font=font)
+        y += int(font_size * rng.uniform(1.5, 2.5))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(calls: int, elapsed: float, latencies) -> dict:
+    enough = len(latencies) >= MIN_P99_SAMPLES
+    return {
+        "images": len(latencies),
+        "calls": calls,
+        "images_per_s": round(len(latencies) / elapsed, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if enough else None,
+    }
+
+
+def run_batches(batches, call, workers: int):
+    """
+    Executa `call(lote)` para cada lote com `workers` threads. Retorna (segundos totais,
+    latência de cada imagem), em que cada imagem recebe o tempo da chamada do seu lote.
+    """
+    def timed(batch):
+        start = time.perf_counter()
+        call(batch)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(timed, batches))
+    return time.perf_counter() - start, [latency for batch, latency in zip(batches, latencies) for _ in batch]
+
+
+def bench_desktop(images, batch_size: int, workers: int, folder: str, runner) -> dict:
+    from metrics import STAGE_SECONDS
+
+    paths = []
+    for idx, data in enumerate(images):
+        path = os.path.join(folder, f"slide_{idx:04d}.png")
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+
+    def call(batch):
+        for result in runner.ocr_paths(batch):
+            if isinstance(result, Exception):
+                raise result
+
+    STAGE_SECONDS.reset()
+    elapsed, latencies = run_batches(batches, call, workers)
+    result = summarize(len(batches), elapsed, latencies)
+    result["stages_ms"] = {name: round(values["mean"] * 1000, 2) for name, values in STAGE_SECONDS.snapshot().items()}
+    return result
+
+
+_STAGE_LINE = re.compile(r'vx9_ocr_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)')
+
+
+def api_stage_totals(session, url: str) -> dict:
+    totals = {}
+    try:
+        text = session.get(f"{url}/metrics", timeout=10).text
+    except Exception:
+        return totals
+    for kind, name, value in _STAGE_LINE.findall(text):
+        totals.setdefault(name, {"sum": 0.0, "count": 0.0})[kind] = float(value)
+    return totals
+
+
+def bench_api(images, batch_size: int, workers: int, url: str, session) -> dict:
+    batches = [list(enumerate(images[i:i + batch_size], start=i)) for i in range(0, len(images), batch_size)]
+
+    def call(batch):
+        if batch_size == 1:
+            idx, data = batch[0]
+            response = session.post(f"{url}/extract-text", files={"file": (f"slide_{idx}.png", data, "image/png")}, timeout=600)
+            response.raise_for_status()
+            return
+        files = [("files", (f"slide_{idx}.png", data, "image/png")) for idx, data in batch]
+        response = session.post(f"{url}/extract-text/batch", files=files, timeout=600)
+        response.raise_for_status()
+        for line in response.text.splitlines():
+            if "error" in json.loads(line):
+                raise RuntimeError(json.loads(line)["error"])
+
+    before = api_stage_totals(session, url)
+    elapsed, latencies = run_batches(batches, call, workers)
+    after = api_stage_totals(session, url)
+
+    result = summarize(len(batches), elapsed, latencies)
+    stages = {}
+    for name, values in after.items():
+        count = values["count"] - before.get(name, {}).get("count", 0)
+        if count:
+            stages[name] = round((values["sum"] - before.get(name, {}).get("sum", 0)) / count * 1000, 2)
+    result["stages_ms"] = stages
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Lista as regressões em relação à linha de base: vazão menor ou p99 maior que a tolerância.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current["images_per_s"] < previous["images_per_s"] * (1 - tolerance):
+            regressions.append(f"{key}: vazão {previous['images_per_s']} -> {current['images_per_s']} imagens/s")
+        # Sem amostras para o p99 (ver MIN_P99_SAMPLES), a latência é comparada pelo p50
+        latency = 'p99_ms' if current["p99_ms"] is not None and previous.get("p99_ms") is not None else 'p50_ms'
+        if current[latency] > previous[latency] * (1 + tolerance):
+            regressions.append(f"{key}: {latency[:3]} {previous[latency]} -> {current[latency]} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['desktop', 'api'], default='desktop')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="endereço da API (modo api)")
+    parser.add_argument('--sizes', nargs='+', default=['1080x1080', '1080x1350', '1080x3840'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--images', type=int, default=MIN_P99_SAMPLES, help="imagens por combinação de tamanho e lote")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="chamadas simultâneas")
+    parser.add_argument('--seed', type=int, default=0, help="semente das imagens (padrão: 0)")
+    parser.add_argument('--save', metavar='ARQUIVO', help="grava os resultados em JSON")
+    parser.add_argument('--baseline', metavar='ARQUIVO', help="compara com resultados salvos por --save")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="piora máxima aceita (fração, padrão: 0.15)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    number = 0
+    # Só no modo api: a mesma semente geraria as mesmas imagens, já no cache da API
+    nonce = os.urandom(4).hex() if args.mode == 'api' else ''
+
+    if args.mode == 'desktop':
+        from carousel_text_extractor import OCRRunner
+
+        runner = OCRRunner()
+        target = runner
+    else:
+        import requests
+
+        target = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.workers)
+        target.mount('http://', adapter)
+        target.mount('https://', adapter)
+
+    results = {}
+    print(f"{'combinação':<26}{'imagens/s':>11}{'p50 ms':>10}{'p99 ms':>10}   etapas (média ms)")
+    try:
+        for size in args.sizes:
+            width, height = (int(v) for v in size.split('x'))
+            for batch_size in args.batch_sizes:
+                images = []
+                for _ in range(args.images):
+                    number += 1
+                    images.append(make_image(width, height, rng, number, nonce))
+                if args.mode == 'desktop':
+                    with tempfile.TemporaryDirectory() as folder:
+                        result = bench_desktop(images, batch_size, args.workers, folder, target)
+                else:
+                    result = bench_api(images, batch_size, args.workers, args.url.rstrip('/'), target)
+
+                key = f"{args.mode}/{size}/lote{batch_size}"
+                results[key] = result
+                stages = '  '.join(f"{name}={value}" for name, value in sorted(result["stages_ms"].items()))
+                p99 = f"{result['p99_ms']:.1f}" if result['p99_ms'] is not None else "-"
+                print(f"{key:<26}{result['images_per_s']:>11.2f}{result['p50_ms']:>10.1f}{p99:>10}   {stages}")
+    finally:
+        if args.mode == 'desktop':
+            target.close()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"Sem regressões acima de {args.tolerance:.0%} em relação a {args.baseline}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
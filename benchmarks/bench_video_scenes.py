@@ -0,0 +1,185 @@
+"""
+Exercita a separação de trechos do OCR de vídeo (`video_ocr.distinct_frames`) com
+clipes sintéticos em que a câmera se move, sem ffmpeg nem motor de OCR.
+
+Cada clipe tem `--seconds` segundos amostrados a `--fps` quadros por segundo
+(720x1280, como um Reel/TikTok reduzido), com legendas brancas queimadas sobre
+um cenário que se move: panorâmica sobre uma textura com bordas nítidas,
+panorâmica sobre ruído, zoom contínuo ou câmera parada. Cada quadro passa por
+JPEG (`--jpeg`), para que haja ruído de compressão como em um vídeo real.
+
+Para cada clipe, reporta quantos quadros iriam para o OCR e em que trechos, e
+confere que cada legenda aparece no quadro escolhido de algum trecho e que o
+número de chamadas de OCR fica em no máximo o dobro do número de trechos reais
+(legendas e intervalos sem legenda); o script termina com código 1 se alguma
+verificação falhar.
+
+Uso:
+    python benchmarks/bench_video_scenes.py
+    python benchmarks/bench_video_scenes.py --speed 80 --jpeg 50
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import video_ocr
+
+WIDTH, HEIGHT = 720, 1280
+
+FONT_CANDIDATES = ("DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "arialbd.ttf")
+
+FIXED = [(0.0, 1.0, "Legenda fixa\nsobre a cena")]
+SEQUENCE = [
+    (0.08, 0.33, "Primeira legenda\ncom duas linhas"),
+    (0.33, 0.58, "Segunda legenda\nbem diferente"),
+    (0.67, 1.0, "Fim do vídeo"),
+]
+
+# (nome, cenário, movimento, legendas em frações da duração)
+SCENARIOS = [
+    ("legenda fixa, panorâmica", 'texture', 'pan', FIXED),
+    ("legenda fixa, panorâmica com ruído", 'noise', 'pan', FIXED),
+    ("legenda fixa, zoom", 'texture', 'zoom', FIXED),
+    ("três legendas, panorâmica", 'texture', 'pan', SEQUENCE),
+    ("três legendas, panorâmica com ruído", 'noise', 'pan', SEQUENCE),
+    ("três legendas, zoom", 'texture', 'zoom', SEQUENCE),
+    ("três legendas, câmera parada", 'texture', 'still', SEQUENCE),
+]
+
+
+def load_font(size: int):
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1: fonte bitmap de tamanho fixo
+        return ImageFont.load_default()
+
+
+def make_scenery(kind: str, width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Cenário maior que o quadro, por onde a câmera passeia: ruído, ou uma textura
+    suave com retângulos de bordas nítidas (o pior caso para um mapa de bordas).
+    """
+    if kind == 'noise':
+        return np.clip(rng.normal(128, 35, (height, width)), 0, 255).astype(np.uint8)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = 110 + 40 * np.sin(x / 37) * np.cos(y / 53) + 30 * np.sin((x + y) / 91)
+    img = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(img)
+    for _ in range(width * height // 20000):
+        x0, y0 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = rng.integers(10, 120, 2)
+        draw.rectangle([x0, y0, x0 + int(size[0]), y0 + int(size[1])], fill=int(rng.integers(0, 256)))
+    return np.asarray(img)
+
+
+def make_frames(kind: str, motion: str, captions, seconds: float, fps: float, speed: float, jpeg: int, seed: int):
+    """
+    Gera (instante, quadro em tons de cinza, legenda visível ou None).
+    """
+    rng = np.random.default_rng(seed)
+    count = int(seconds * fps)
+    travel = int(speed * seconds) if motion == 'pan' else 0
+    scenery = make_scenery(kind, WIDTH + travel + 2, HEIGHT, rng)
+    font = load_font(44)
+    for index in range(count):
+        timestamp = index / fps
+        if motion == 'pan':
+            x0 = int(speed * timestamp)
+            view = Image.fromarray(scenery[:, x0:x0 + WIDTH])
+        elif motion == 'zoom':
+            # Aproximação contínua de 2% por segundo a partir do centro
+            scale = 1 + 0.02 * timestamp
+            w, h = int(WIDTH / scale), int(HEIGHT / scale)
+            left, top = (WIDTH - w) // 2, (HEIGHT - h) // 2
+            view = Image.fromarray(scenery[top:top + h, left:left + w]).resize((WIDTH, HEIGHT), Image.BILINEAR)
+        else:
+            view = Image.fromarray(scenery[:, :WIDTH])
+        noise = rng.normal(0, 3, (HEIGHT, WIDTH))
+        view = Image.fromarray(np.clip(np.asarray(view, dtype=np.float32) + noise, 0, 255).astype(np.uint8))
+
+        caption = next((text for start, end, text in captions if start <= index / count < end), None)
+        if caption:
+            ImageDraw.Draw(view).multiline_text((60, 900), caption, fill=255, font=font, spacing=16,
+                                                stroke_width=3, stroke_fill=0)
+        buffer = io.BytesIO()
+        view.save(buffer, format='JPEG', quality=jpeg)
+        yield timestamp, np.asarray(Image.open(buffer).convert('L')), caption
+
+
+def stretches(captions) -> int:
+    """
+    Número de trechos reais do clipe: cada legenda e cada intervalo sem legenda.
+    """
+    count, position = 0, 0.0
+    for start, end, _ in captions:
+        count += 1 + (start > position)
+        position = end
+    return count + (position < 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--fps', type=float, default=video_ocr.VIDEO_SAMPLE_FPS)
+    parser.add_argument('--speed', type=float, default=16, help="velocidade da panorâmica, em pixels por segundo")
+    parser.add_argument('--jpeg', type=int, default=75, help="qualidade JPEG de cada quadro")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{args.seconds:.0f} s a {args.fps:g} quadros/s, panorâmica de {args.speed:g} px/s, JPEG {args.jpeg}")
+    print(f"{'clipe':<38}{'quadros':>8}{'OCR':>5}{'ms/quadro':>11}  trechos")
+    for name, kind, motion, captions in SCENARIOS:
+        visible = {}
+        generating = 0.0
+
+        def frames():
+            nonlocal generating
+            clip = make_frames(kind, motion, captions, args.seconds, args.fps, args.speed, args.jpeg, args.seed)
+            while True:
+                start = time.perf_counter()
+                item = next(clip, None)
+                generating += time.perf_counter() - start
+                if item is None:
+                    return
+                timestamp, frame, caption = item
+                visible[timestamp] = caption
+                yield timestamp, frame
+
+        start = time.perf_counter()
+        runs = [(begin, end) for begin, end, _ in video_ocr.distinct_frames(frames())]
+        # Só o tempo da separação de trechos, sem a geração dos quadros
+        spent = time.perf_counter() - start - generating
+        chosen = [visible[end] for _, end in runs]
+
+        summary = ' | '.join(f"{start:.1f}-{end:.1f} {(text or '-').splitlines()[0][:12]}"
+                             for (start, end), text in zip(runs, chosen))
+        print(f"{name:<38}{len(visible):>8}{len(runs):>5}{spent / len(visible) * 1000:>11.1f}  {summary}")
+
+        for _, _, caption in captions:
+            if caption not in chosen:
+                failures.append(f"{name}: a legenda {caption.splitlines()[0]!r} não chegou ao OCR")
+        if len(runs) > 2 * stretches(captions):
+            failures.append(f"{name}: {len(runs)} chamadas de OCR para {stretches(captions)} trechos")
+
+    for failure in failures:
+        print(f"FALHA {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,43 +1,523 @@
 """
 Extrator de Texto de Carrosséis
 Ferramenta para extrair texto de imagens usando OCR e baixar mídias de redes sociais.
+
+Uso:
+    python carousel_text_extractor.py                                  # interface gráfica
+    python carousel_text_extractor.py --input PASTA --output saida.csv # modo headless (sem Tk)
+    python carousel_text_extractor.py --urls links.txt --output saida.csv --download-dir posts
+                                                                       # lista de posts, retomável
+    python carousel_text_extractor.py --video video.mp4 --output saida.jsonl # texto dos quadros de um vídeo
+
+Os textos extraídos também vão para o índice de busca (`text_index`), compartilhado
+com a API: pela URL do post nos downloads e pelo caminho do arquivo nas pastas locais.
+
+Módulos pesados (tkinter, openpyxl, instaloader, TikTokApi, NumPy e o motor de OCR)
+são importados apenas quando a funcionalidade que depende deles é usada.
 """
 
-import csv
-import pprint
+import argparse
+import os
 import re
 import shutil
+import sys
 import tempfile
 import threading
 import traceback
-import tkinter as tk
 from pathlib import Path
-from tkinter import filedialog, messagebox, scrolledtext, ttk
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from exporters import export_records, open_exporter
+from image_catalog import ImageCatalog, scan_images
+from metrics import stage
+from ocr_cache import OCRCache, make_file_key
+from preview_cache import PreviewCache
+
+# Coleção do índice de busca usada pela interface gráfica
+DESKTOP_COLLECTION = "desktop"
+
+# Preenchidos por _load_gui_modules() quando a interface gráfica é aberta
+tk = filedialog = messagebox = scrolledtext = ttk = ImageTk = None
+
+def _load_gui_modules():
+    """
+    Importa o tkinter (e o ImageTk) só quando a interface gráfica é usada,
+    para que o modo headless rode em servidores sem Tk instalado.
+    """
+    global tk, filedialog, messagebox, scrolledtext, ttk, ImageTk
+    if tk is not None:
+        return
+    import tkinter
+    from tkinter import filedialog as _filedialog, messagebox as _messagebox, scrolledtext as _scrolledtext, ttk as _ttk
+    from PIL import ImageTk as _ImageTk
+    tk, filedialog, messagebox, scrolledtext, ttk, ImageTk = (
+        tkinter, _filedialog, _messagebox, _scrolledtext, _ttk, _ImageTk
+    )
+
+
+def clean_text(text: str) -> str:
+    with stage('clean_text'):
+        text = re.sub(r'\s+', ' ', text)
+        text = ''.join(char for char in text if char.isprintable() or char == '\n')
+        return text.strip()
 
-import instaloader
-import pandas as pd
-import pytesseract
-import requests
-from PIL import Image, ImageTk
-from TikTokApi import TikTokApi
+
+class OCRRunner:
+    """
+    Execução do OCR sobre arquivos em disco, compartilhada pela interface gráfica
+    e pelo modo headless: cache, motor de OCR, divisão de imagens altas e pool de threads.
+    """
+
+    def __init__(self):
+        from ocr_engine import OCR_BULK_SIZE, get_engine
+        from preprocessing import signature as preprocess_signature
+
+        from perceptual_index import OCR_PHASH, PerceptualIndex
+        from text_index import open_text_index
+
+        self.bulk_size = OCR_BULK_SIZE
+        self.cache = OCRCache()
+        self.cache_config = preprocess_signature()
+        # Slides repostados ou recomprimidos reaproveitam o texto de uma versão já lida
+        self.phash_index = PerceptualIndex() if OCR_PHASH else None
+        self.phash_namespace = f"por:{self.cache_config}"
+        # Índice de busca dos textos extraídos (None com TEXT_INDEX_DB="")
+        self.text_index = open_text_index()
+        self.engine = get_engine()
+        # Threads para reconhecer em paralelo as tiras de imagens muito altas
+        self.tile_workers = os.cpu_count() or 1
+        self.tile_executor = ThreadPoolExecutor(max_workers=self.tile_workers)
+
+    def close(self):
+        self.tile_executor.shutdown(wait=False, cancel_futures=True)
+        self.cache.close()
+        if self.phash_index is not None:
+            self.phash_index.close()
+        if self.text_index is not None:
+            self.text_index.close()
+
+    def index_texts(self, collection, entries):
+        """
+        Grava textos no índice de busca: (origem, posição, imagem, legenda, texto).
+        Uma falha no índice é só avisada; a extração continua.
+        """
+        if self.text_index is None or not entries:
+            return
+        try:
+            self.text_index.add_many(collection, entries)
+        except Exception as e:
+            print(f"Aviso: não foi possível indexar os textos para busca: {e}", file=sys.stderr)
+
+    def _similar_text(self, path):
+        """
+        Procura no índice perceptual uma versão quase idêntica da imagem.
+        Retorna (texto ou None, hashes da imagem para indexá-la depois do OCR).
+        """
+        from perceptual_index import image_hashes
+
+        if self.phash_index is None:
+            return None, None
+        try:
+            hashes = image_hashes(path)
+        except Exception:
+            return None, None
+        similar = self.phash_index.lookup(hashes, self.phash_namespace)
+        return (self.cache.get(similar) if similar is not None else None), hashes
+
+    def _store(self, key, text, hashes):
+        if hashes is not None:
+            self.phash_index.add(hashes, self.phash_namespace, key)
+
+    def ocr_paths(self, paths):
+        """
+        Extrai o texto de um grupo de imagens: as já processadas (aqui ou pela API),
+        ou versões quase idênticas delas, vêm do cache e as demais são pré-processadas
+        e vão juntas ao motor de OCR. Uma imagem que outra thread já está lendo (ou
+        repetida no grupo) não vai de novo ao motor: aguarda o resultado dela.
+        Retorna, na mesma ordem, o texto limpo ou a exceção de cada imagem.
+        """
+        from ocr_engine import ocr_sources
+        from tiling import ocr_tiled
+
+        results = [None] * len(paths)
+        missing = []
+        waiting = []
+        for pos, path in enumerate(paths):
+            try:
+                key = make_file_key(path, 'por', self.cache_config)
+            except OSError as e:
+                results[pos] = e
+                continue
+            text = self.cache.get(key)
+            hashes = None
+            if text is None:
+                text, hashes = self._similar_text(path)
+            if text is not None:
+                results[pos] = text
+                continue
+            pending = self.cache.claim(key)
+            if pending is None:
+                missing.append((pos, key, hashes))
+            else:
+                waiting.append((pos, pending))
+
+        claimed = list(missing)
+        try:
+            # Imagens muito altas são divididas em tiras reconhecidas em paralelo
+            regular = []
+            for pos, key, hashes in missing:
+                try:
+                    text = ocr_tiled(paths[pos], self.tile_executor, self.tile_workers, lang='por', engine=self.engine)
+                except Exception as e:
+                    results[pos] = e
+                    continue
+                if text is None:
+                    regular.append((pos, key, hashes))
+                else:
+                    results[pos] = clean_text(text)
+                    self._store(key, results[pos], hashes)
+            missing = regular
+
+            if missing:
+                batch = [paths[pos] for pos, _, _ in missing]
+                for (pos, key, hashes), result in zip(missing, ocr_sources(batch, lang='por', engine=self.engine)):
+                    if isinstance(result, Exception):
+                        results[pos] = result
+                    else:
+                        results[pos] = clean_text(result)
+                        self._store(key, results[pos], hashes)
+        finally:
+            # Libera quem aguarda estas imagens em outras threads, mesmo se o lote falhou
+            error = sys.exc_info()[1]
+            for pos, key, _ in claimed:
+                result = results[pos]
+                if result is None:
+                    result = error if error is not None else RuntimeError("OCR interrompido")
+                self.cache.resolve(key, result)
+
+        # Só depois de liberar as próprias imagens, para que duas threads nunca se aguardem
+        for pos, pending in waiting:
+            try:
+                results[pos] = pending.result()
+            except Exception as e:
+                results[pos] = e
+        return results
+
+    def ocr_video(self, path, frames_dir):
+        """
+        Extrai os segmentos de texto de um vídeo (ver `video_ocr`), salvando o
+        quadro de cada segmento em `frames_dir`. O texto dos quadros vai para o
+        cache, então processá-los depois como imagens não repete o OCR.
+        """
+        from video_ocr import ocr_video
+
+        result = ocr_video(path, lang='por', engine=self.engine, frames_dir=frames_dir)
+        for segment in result['segments']:
+            segment['text'] = clean_text(segment['text'])
+            self.cache.put(make_file_key(segment['image'], 'por', self.cache_config), segment['text'])
+        return result
+
+    def run(self, paths, workers, cancel_event=None):
+        """
+        Processa as imagens em um pool de `workers` threads, em grupos de até
+        `OCR_BULK_SIZE`. Gera pares (índice do primeiro item, resultados) à medida
+        que cada grupo termina; para cedo se `cancel_event` for acionado, descartando
+        os grupos que ainda não começaram.
+        """
+        # Grupos menores quando há poucas imagens, para ocupar todos os workers
+        chunk_size = max(1, min(self.bulk_size, -(-len(paths) // workers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.ocr_paths, paths[start:start + chunk_size]): start
+                for start in range(0, len(paths), chunk_size)
+            }
+            try:
+                for future in as_completed(futures):
+                    start = futures[future]
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        results = [e] * len(paths[start:start + chunk_size])
+                    yield start, results
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+            finally:
+                for pending in futures:
+                    pending.cancel()
+
+
+def export_ocr_results(runner, images_data, workers, exporter, verbose=True, collection=None) -> int:
+    """
+    Executa o OCR do catálogo e grava cada imagem no exportador assim que ela
+    (e as anteriores) terminam, na ordem do carrossel. O texto não fica guardado
+    nos registros, então o uso de memória não cresce com o número de imagens.
+    O texto já presente no registro (ex.: a legenda do post) precede o OCR.
+    Com `collection`, o texto de cada imagem também é indexado para busca, com o
+    caminho do arquivo como origem. Retorna o número de imagens com erro.
+    """
+    total = len(images_data)
+    done = 0
+    errors = 0
+    ready = {}
+    next_index = 0
+    for start, results in runner.run([img.path for img in images_data], workers):
+        for img_data, result in zip(images_data[start:start + len(results)], results):
+            done += 1
+            if isinstance(result, Exception):
+                errors += 1
+                print(f"[{done}/{total}] Erro na imagem {img_data.name}: {result}", file=sys.stderr)
+            elif verbose:
+                print(f"[{done}/{total}] {img_data.name}", file=sys.stderr)
+
+        ready[start] = results
+        while next_index in ready:
+            results = ready.pop(next_index)
+            entries = []
+            for img_data, result in zip(images_data[next_index:next_index + len(results)], results):
+                text = img_data.text
+                if not isinstance(result, Exception):
+                    text = (text + "\n--- OCR ---\n" + result).strip() if text else result
+                    entries.append((os.path.abspath(img_data.path), img_data.order, img_data.name, '', result))
+                exporter.write(img_data.order, img_data.name, text)
+            if collection is not None:
+                runner.index_texts(collection, entries)
+            next_index += len(results)
+    return errors
+
+
+def run_headless(input_dir, output, workers=None, collection=None) -> int:
+    """
+    Extrai o texto de todas as imagens de `input_dir` e salva em `output`
+    (.csv, .jsonl, .parquet ou .xlsx, gravado à medida que o OCR avança),
+    sem abrir a interface gráfica. Os textos são indexados na coleção
+    `collection` (padrão: o nome da pasta). Retorna o código de saída.
+    """
+    import pytesseract
+
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"Tesseract OCR não encontrado ou não configurado corretamente: {e}", file=sys.stderr)
+        return 1
+
+    images_data = ImageCatalog()
+    images_data.add_many(scan_images(input_dir))
+    if not images_data:
+        print(f"Nenhuma imagem encontrada em {input_dir}", file=sys.stderr)
+        return 1
+
+    workers = workers or int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+
+    runner = OCRRunner()
+    try:
+        with open_exporter(output) as exporter:
+            errors = export_ocr_results(runner, images_data, workers, exporter,
+                                        collection=collection or os.path.basename(os.path.abspath(input_dir)))
+    finally:
+        runner.close()
+
+    print(f"Extração concluída: {len(images_data) - errors} de {len(images_data)} imagens. Resultado salvo em {output}", file=sys.stderr)
+    return 0 if errors < len(images_data) else 1
+
+
+def run_bulk(urls_file, output, download_dir, workers=None, concurrency=None, checkpoint_path=None,
+             collection=None) -> int:
+    """
+    Baixa e extrai o texto de uma lista de posts (uma URL por linha), salvando
+    as imagens em `download_dir/<plataforma>_<id>/` e o resultado em `output`.
+
+    Os posts concluídos vão para um checkpoint (por padrão `download_dir/checkpoint.txt`);
+    numa nova execução eles não são baixados de novo, e seu texto vem do cache de OCR.
+    `output` recebe primeiro os posts de execuções anteriores, na ordem da lista, e
+    depois cada post novo assim que ele termina: o arquivo acompanha o checkpoint.
+    O texto de cada post é indexado para busca com a URL como origem, na coleção
+    `collection` (padrão: o nome do arquivo de URLs).
+    """
+    import pytesseract
+
+    import downloader
+    from social_clients import INGEST_CONCURRENCY, Checkpoint, ingest_urls, parse_post_url, post_key, read_url_list
+    from video_ocr import format_timestamp
+
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"Tesseract OCR não encontrado ou não configurado corretamente: {e}", file=sys.stderr)
+        return 1
+
+    urls = read_url_list(urls_file)
+    if not urls:
+        print(f"Nenhuma URL encontrada em {urls_file}", file=sys.stderr)
+        return 1
+
+    os.makedirs(download_dir, exist_ok=True)
+    checkpoint = Checkpoint(checkpoint_path or os.path.join(download_dir, 'checkpoint.txt'))
+    workers = workers or int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+    concurrency = concurrency or INGEST_CONCURRENCY
+    collection = collection or Path(urls_file).stem
+
+    def post_folder(url):
+        platform, post_id = parse_post_url(url)
+        return os.path.join(download_dir, f"{platform}_{post_id}")
+
+    runner = OCRRunner()
+
+    def handle_post(post):
+        """
+        Baixa e lê o post. Retorna (legenda, [(posição, imagem, texto)]) para o índice de busca.
+        """
+        folder = os.path.join(download_dir, f"{post.platform}_{post.post_id}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, 'caption.txt'), 'w', encoding='utf-8') as f:
+            f.write(post.caption_text())
+        if not post.image_urls:
+            # Vídeo: os quadros com texto distinto ficam na pasta como imagens
+            video_path = downloader.download_file(post.video_url, os.path.join(folder, 'video.mp4'))
+            segments = runner.ocr_video(video_path, frames_dir=folder)['segments']
+            os.remove(video_path)
+            return post.caption, [
+                (order, f"{format_timestamp(segment['start'])} - {format_timestamp(segment['end'])}", segment['text'])
+                for order, segment in enumerate(segments, start=1)
+            ]
+
+        jobs = [(image_url, os.path.join(folder, f"image_{i+1:03d}.jpg")) for i, image_url in enumerate(post.image_urls)]
+        # O OCR aqui só aquece o cache; o resultado final é montado a partir das pastas
+        results = {}
+        downloader.download_and_process(
+            jobs, lambda path: runner.ocr_paths([path])[0],
+            lambda idx, path, result: results.__setitem__(idx, result),
+            process_workers=max(1, workers // concurrency),
+        )
+        errors = [result for result in results.values() if isinstance(result, Exception)]
+        if errors:
+            # Sem checkpoint: o post é refeito na próxima execução
+            raise errors[0]
+        return post.caption, [(idx + 1, os.path.basename(jobs[idx][1]), text) for idx, text in sorted(results.items())]
+
+    images_data = ImageCatalog()
+
+    def export_post(url, exporter):
+        """
+        Grava as imagens da pasta do post no resultado; o texto vem do cache de OCR.
+        """
+        folder = post_folder(url)
+        if not os.path.isdir(folder):
+            return
+        caption_path = os.path.join(folder, 'caption.txt')
+        caption_text = ''
+        if os.path.exists(caption_path):
+            with open(caption_path, encoding='utf-8') as f:
+                caption_text = f.read()
+        start = len(images_data)
+        images_data.add_many(scan_images(folder), caption_text)
+        export_ocr_results(runner, images_data[start:], workers, exporter, verbose=False)
+
+    def previous_run(url):
+        try:
+            return post_key(url) in checkpoint
+        except ValueError:
+            return False
+
+    failed = 0
+    done = len(checkpoint)
+    try:
+        with open_exporter(output) as exporter:
+            if done:
+                print(f"Retomando: {done} posts já concluídos no checkpoint.", file=sys.stderr)
+                for url in urls:
+                    if previous_run(url):
+                        export_post(url, exporter)
+
+            for url, result in ingest_urls(urls, handle_post, concurrency=concurrency, checkpoint=checkpoint):
+                if isinstance(result, Exception):
+                    failed += 1
+                    print(f"Erro no post {url}: {result}", file=sys.stderr)
+                else:
+                    done += 1
+                    caption, items = result
+                    runner.index_texts(collection, [(url, order, image, caption, text) for order, image, text in items])
+                    # Já está no checkpoint: vai para o resultado agora, não só no fim da lista
+                    export_post(url, exporter)
+                    print(f"[{done}/{len(urls)}] {url} ({len(items)} imagens)", file=sys.stderr)
+    finally:
+        runner.close()
+
+    print(f"Lista concluída: {done} posts ({failed} com erro), {len(images_data)} imagens. "
+          f"Resultado salvo em {output}", file=sys.stderr)
+    return 0 if failed == 0 else 1
+
+
+def run_video(video_path, output, collection=None) -> int:
+    """
+    Extrai o texto queimado nos quadros de um vídeo local e salva os segmentos
+    em `output`, um por linha, com o intervalo (início - fim) no lugar do nome da imagem.
+    Os segmentos são indexados para busca na coleção `collection` (padrão: o nome do vídeo).
+    """
+    import pytesseract
+
+    from video_ocr import format_timestamp
+
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"Tesseract OCR não encontrado ou não configurado corretamente: {e}", file=sys.stderr)
+        return 1
+
+    runner = OCRRunner()
+    try:
+        try:
+            with tempfile.TemporaryDirectory() as frames_dir:
+                result = runner.ocr_video(video_path, frames_dir)
+        except Exception as e:
+            print(f"Erro ao processar o vídeo: {e}", file=sys.stderr)
+            return 1
+
+        entries = []
+        with open_exporter(output) as exporter:
+            for order, segment in enumerate(result['segments'], start=1):
+                interval = f"{format_timestamp(segment['start'])} - {format_timestamp(segment['end'])}"
+                exporter.write(order, interval, segment['text'])
+                entries.append((os.path.abspath(video_path), order, interval, '', segment['text']))
+        runner.index_texts(collection or Path(video_path).stem, entries)
+    finally:
+        runner.close()
+
+    print(f"Vídeo concluído: {len(result['segments'])} segmentos de texto, {result['frames_ocr']} de "
+          f"{result['frames_sampled']} quadros amostrados passaram pelo OCR. Resultado salvo em {output}",
+          file=sys.stderr)
+    return 0
 
 
 class CarouselTextExtractor:
     def __init__(self, root):
+        _load_gui_modules()
         self.root = root
         self.root.title("Extrator de Texto de Carrosséis")
         self.root.geometry("1000x800")
 
-        self.images_data = []
+        self.images_data = ImageCatalog()
         self.current_preview_index = 0
         self.temp_dirs = []
+        # Criado no primeiro "Extrair Texto", para não carregar o motor de OCR na abertura
+        self.ocr_runner = None
+        self.preview_cache = PreviewCache()
+
+        # Estado da extração em segundo plano
+        self.extraction_id = 0
+        self.cancel_event = None
+        self.ocr_workers_var = tk.IntVar(value=int(os.getenv("OCR_WORKERS", os.cpu_count() or 1)))
 
         self.setup_ui()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind("<Left>", self._on_arrow_key)
+        self.root.bind("<Right>", self._on_arrow_key)
 
     def on_closing(self):
+        self.cancel_extraction()
         self._cleanup_temp_dirs()
+        if self.ocr_runner is not None:
+            self.ocr_runner.close()
+        self.preview_cache.close()
         self.root.destroy()
 
     def _cleanup_temp_dirs(self):
@@ -71,8 +551,12 @@ class CarouselTextExtractor:
         ttk.Label(download_frame, text="URL (TikTok ou Instagram):").pack(anchor=tk.W)
         self.media_url_entry = ttk.Entry(download_frame)
         self.media_url_entry.pack(fill=tk.X, expand=True, pady=5)
-        self.download_button = ttk.Button(download_frame, text="Baixar Mídia", command=self.start_download)
-        self.download_button.pack(pady=5)
+        download_buttons = ttk.Frame(download_frame)
+        download_buttons.pack(pady=5)
+        self.download_button = ttk.Button(download_buttons, text="Baixar Mídia", command=self.start_download)
+        self.download_button.pack(side=tk.LEFT, padx=5)
+        self.bulk_download_button = ttk.Button(download_buttons, text="Lista de URLs...", command=self.start_bulk_download)
+        self.bulk_download_button.pack(side=tk.LEFT, padx=5)
         self.download_status_label = ttk.Label(download_frame, text="")
         self.download_status_label.pack()
 
@@ -101,11 +585,20 @@ class CarouselTextExtractor:
 
         action_frame = ttk.Frame(right_column)
         action_frame.pack(pady=10)
-        ttk.Button(action_frame, text="Extrair Texto (OCR)", command=self.extract_text).pack(side=tk.LEFT, padx=5)
+        self.extract_button = ttk.Button(action_frame, text="Extrair Texto (OCR)", command=self.extract_text)
+        self.extract_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(action_frame, text="Cancelar", command=self.cancel_extraction, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="Salvar CSV", command=self.save_csv).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="Salvar Excel", command=self.save_excel).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="Limpar Tudo", command=self.clear_all).pack(side=tk.LEFT, padx=5)
 
+        workers_frame = ttk.Frame(right_column)
+        workers_frame.pack()
+        ttk.Label(workers_frame, text="Imagens em paralelo:").pack(side=tk.LEFT)
+        ttk.Spinbox(workers_frame, from_=1, to=max(2, (os.cpu_count() or 1) * 2), width=4,
+                    textvariable=self.ocr_workers_var).pack(side=tk.LEFT, padx=5)
+
         self.progress = ttk.Progressbar(main_frame, mode='determinate')
         self.progress.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10)
 
@@ -128,106 +621,236 @@ class CarouselTextExtractor:
             messagebox.showwarning("Aviso", "Por favor, insira uma URL.")
             return
 
-        self.download_button.config(state=tk.DISABLED)
-        self.download_status_label.config(text="Iniciando download...")
+        from social_clients import UnsupportedURLError, parse_post_url
 
-        domain = urlparse(url).netloc.lower()
-        target_func = None
-        if "tiktok.com" in domain:
-            target_func = self._download_and_load_tiktok
-        elif "instagram.com" in domain:
-            target_func = self._download_and_load_instagram
-        else:
+        try:
+            parse_post_url(url)
+        except UnsupportedURLError:
             messagebox.showerror("Erro", "URL não suportada. Use links do TikTok ou Instagram.")
-            self.download_button.config(state=tk.NORMAL)
-            self.download_status_label.config(text="")
             return
 
-        thread = threading.Thread(target=target_func, args=(url,))
-        thread.daemon = True
-        thread.start()
+        self._start_download_thread(self._download_and_load_post, url)
+
+    def start_bulk_download(self):
+        file_path = filedialog.askopenfilename(
+            title="Arquivo com uma URL por linha",
+            filetypes=[("Texto", "*.txt"), ("Todos", "*.*")]
+        )
+        if not file_path:
+            return
+
+        from social_clients import read_url_list
 
-    def _download_and_load_tiktok(self, url):
         try:
-            self.root.after(0, lambda: self.download_status_label.config(text="TikTok: Criando pasta temporária..."))
-            temp_dir = tempfile.mkdtemp()
-            self.temp_dirs.append(temp_dir)
-            
-            self.root.after(0, lambda: self.download_status_label.config(text="TikTok: Acessando API... (pode levar um momento)"))
+            urls = read_url_list(file_path)
+        except OSError as e:
+            messagebox.showerror("Erro", f"Erro ao ler a lista de URLs: {str(e)}")
+            return
+        if not urls:
+            messagebox.showwarning("Aviso", "Nenhuma URL encontrada no arquivo.")
+            return
 
-            api = TikTokApi()
-            video = api.video(url)
-            
-            video_info = asyncio.run(video.info()) # Call the async method to get the dictionary
+        self._start_download_thread(self._download_url_list, urls)
+
+    def _start_download_thread(self, target_func, *args):
+        self.download_button.config(state=tk.DISABLED)
+        self.bulk_download_button.config(state=tk.DISABLED)
+        self.download_status_label.config(text="Iniciando download...")
 
-            if 'image_post' not in video_info:
-                raise ValueError("O link não parece ser um carrossel de imagens ou os dados não foram retornados.")
+        # As imagens baixadas já passam pelo OCR durante o download
+        if self.ocr_runner is None:
+            self.ocr_runner = OCRRunner()
+        try:
+            workers = max(1, int(self.ocr_workers_var.get()))
+        except (tk.TclError, ValueError):
+            workers = 1
 
-            image_post_data = video_info['image_post']
-            images = image_post_data.get('images', [])
-            
-            if not images:
-                raise ValueError("Nenhuma imagem encontrada no post do carrossel.")
+        thread = threading.Thread(target=target_func, args=(*args, workers))
+        thread.daemon = True
+        thread.start()
 
-            image_count = len(images)
-            self.root.after(0, lambda: self.download_status_label.config(text=f"TikTok: Encontradas {image_count} imagens. Baixando..."))
+    def _finish_download(self):
+        self.root.after(0, lambda: self.download_button.config(state=tk.NORMAL))
+        self.root.after(0, lambda: self.bulk_download_button.config(state=tk.NORMAL))
+        self.root.after(0, lambda: self.download_status_label.config(text=""))
 
-            caption = video_info.get('desc', '')
-            caption_text = f"Legenda do TikTok:\n{'-'*20}\n{caption}\n{'-'*20}\n\n" if caption else ""
+    def _download_and_load_post(self, url, workers=1):
+        from social_clients import fetch_post, parse_post_url
 
-            for i, image_data in enumerate(images):
-                self.root.after(0, lambda i=i: self.download_status_label.config(text=f"TikTok: Baixando imagem {i+1}/{image_count}..."))
-                
-                image_url = image_data.get('image_url', {}).get('url_list', [None])[-1]
-                if not image_url:
-                    continue
+        try:
+            platform, _ = parse_post_url(url)
+            label = "Instagram" if platform == 'instagram' else "TikTok"
+            self.root.after(0, lambda: self.download_status_label.config(text=f"{label}: Consultando post... (pode levar um momento)"))
 
-                response = requests.get(image_url, stream=True)
-                response.raise_for_status()
-                
-                file_name = f"image_{i+1}.jpg"
-                file_path = Path(temp_dir) / file_name
-                
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            
-            self.root.after(0, lambda: self.download_status_label.config(text="Download concluído! Carregando imagens..."))
-            self.root.after(100, self.load_images_from_folder, temp_dir, caption_text)
+            # O cliente de cada plataforma é criado uma vez e reaproveitado nos próximos links
+            post = fetch_post(url)
+            temp_dir = tempfile.mkdtemp()
+            self.temp_dirs.append(temp_dir)
+            if post.image_urls:
+                items = self._download_and_ocr(label, temp_dir, post.image_urls, post.caption_text(), workers)
+            else:
+                items = self._download_and_ocr_video(label, temp_dir, post.video_url, post.caption_text())
+            self._index_post(url, post, items)
 
         except Exception as e:
             self._handle_download_error(e)
         finally:
-            self.root.after(0, lambda: self.download_button.config(state=tk.NORMAL))
-            self.root.after(0, lambda: self.download_status_label.config(text=""))
+            self._finish_download()
 
-    def _download_and_load_instagram(self, url):
-        try:
-            self.root.after(0, lambda: self.download_status_label.config(text="Instagram: Criando pasta temporária..."))
+    def _download_url_list(self, urls, workers=1):
+        """
+        Baixa e lê uma lista de posts, com concorrência e taxa de consultas
+        limitadas por `INGEST_CONCURRENCY` e `INGEST_RATE`.
+        """
+        from social_clients import INGEST_CONCURRENCY, ingest_urls
+
+        def handle_post(post):
             temp_dir = tempfile.mkdtemp()
             self.temp_dirs.append(temp_dir)
+            if post.image_urls:
+                items = self._download_and_ocr(post.key, temp_dir, post.image_urls, post.caption_text(),
+                                               max(1, workers // INGEST_CONCURRENCY))
+            else:
+                items = self._download_and_ocr_video(post.key, temp_dir, post.video_url, post.caption_text())
+            return post, items
+
+        try:
+            done = 0
+            for url, result in ingest_urls(urls, handle_post):
+                done += 1
+                self.root.after(0, lambda done=done: self.download_status_label.config(
+                    text=f"Lista: {done}/{len(urls)} posts processados..."))
+                if isinstance(result, Exception):
+                    self.root.after(0, lambda url=url, result=result: self.results_text.insert(
+                        tk.END, f"\nErro no post {url}: {result}\n"))
+                else:
+                    self._index_post(url, *result)
+            self.root.after(0, lambda done=done: messagebox.showinfo(
+                "Concluído", f"Lista processada: {done} posts."))
+        except Exception as e:
+            self._handle_download_error(e)
+        finally:
+            self._finish_download()
 
-            self.root.after(0, lambda: self.download_status_label.config(text="Instagram: Inicializando Instaloader (anônimo)..."))
-            L = instaloader.Instaloader(download_videos=False, save_metadata=False, post_metadata_txt_pattern='')
+    def _index_post(self, url, post, items):
+        """
+        Indexa para busca os textos de um post baixado, com a URL como origem.
+        `items` são (posição, imagem, texto), como retornados pelos métodos de download.
+        """
+        self.ocr_runner.index_texts(DESKTOP_COLLECTION, [
+            (url, order, image, post.caption, text) for order, image, text in items
+        ])
 
-            path = urlparse(url).path
-            shortcode = [s for s in path.split('/') if s][-1]
-            self.root.after(0, lambda: self.download_status_label.config(text=f"Instagram: Baixando post '{shortcode}'..."))
-            
-            post = instaloader.Post.from_shortcode(L.context, shortcode)
-            L.download_post(post, target=Path(temp_dir))
+    def _download_and_ocr(self, source_name, temp_dir, image_urls, caption_text, workers):
+        """
+        Baixa as imagens em paralelo (sessão HTTP compartilhada) e envia cada uma
+        ao OCR assim que chega, em vez de esperar o carrossel inteiro. Roda na
+        thread do download; cada imagem lida é entregue à interface via `root.after`
+        (ver `_on_download_result`), então o primeiro texto aparece após um
+        download e um OCR. Retorna (posição, imagem, texto) das imagens lidas,
+        para o índice de busca.
+        """
+        import downloader
 
-            caption = post.caption
-            caption_text = f"Legenda do Instagram:\n{'-'*20}\n{caption}\n{'-'*20}\n\n" if caption else ""
+        jobs = [(image_url, os.path.join(temp_dir, f"image_{i+1}.jpg")) for i, image_url in enumerate(image_urls)]
+        total = len(jobs)
+        results = {}
+        lock = threading.Lock()
+        # Estado da exibição em ordem, só acessado na thread do Tk
+        stream = {'next': 0, 'done': {}, 'caption': caption_text, 'first': None}
 
-            self.root.after(0, lambda: self.download_status_label.config(text="Download concluído! Carregando imagens..."))
-            self.root.after(100, self.load_images_from_folder, temp_dir, caption_text)
+        def on_result(idx, path, result):
+            with lock:
+                results[path] = result
+                done = len(results)
+            self.root.after(0, self._on_download_result, stream, idx, path, result)
+            self.root.after(0, lambda: self.download_status_label.config(
+                text=f"{source_name}: {done}/{total} imagens baixadas e lidas..."))
 
-        except Exception as e:
-            self._handle_download_error(e)
-        finally:
-            self.root.after(0, lambda: self.download_button.config(state=tk.NORMAL))
-            self.root.after(0, lambda: self.download_status_label.config(text=""))
+        self.root.after(0, lambda: self.download_status_label.config(
+            text=f"{source_name}: Encontradas {total} imagens. Baixando e extraindo texto..."))
+        downloader.download_and_process(
+            jobs,
+            lambda path: self.ocr_runner.ocr_paths([path])[0],
+            on_result,
+            process_workers=workers,
+        )
+
+        self.root.after(0, lambda: self.download_status_label.config(text="Download concluído!"))
+        return [
+            (order, os.path.basename(path), results[path])
+            for order, (_, path) in enumerate(jobs, start=1)
+            if path in results and not isinstance(results[path], Exception)
+        ]
+
+    def _download_and_ocr_video(self, source_name, temp_dir, video_url, caption_text):
+        """
+        Baixa o vídeo e extrai o texto queimado nos quadros: cada segmento de
+        texto distinto vira uma imagem do carrossel, com o intervalo em que aparece.
+        Retorna (posição, intervalo, texto) de cada segmento, para o índice de busca.
+        """
+        import downloader
+        from video_ocr import format_timestamp
+
+        self.root.after(0, lambda: self.download_status_label.config(text=f"{source_name}: Baixando vídeo..."))
+        video_path = downloader.download_file(video_url, os.path.join(temp_dir, "video.mp4"))
+
+        self.root.after(0, lambda: self.download_status_label.config(text=f"{source_name}: Lendo o texto dos quadros..."))
+        result = self.ocr_runner.ocr_video(video_path, frames_dir=temp_dir)
+        os.remove(video_path)
+
+        paths, results, items = [], {}, []
+        for order, segment in enumerate(result['segments'], start=1):
+            interval = f"{format_timestamp(segment['start'])} - {format_timestamp(segment['end'])}"
+            paths.append(segment['image'])
+            results[segment['image']] = f"[{interval}]\n{segment['text']}"
+            items.append((order, interval, segment['text']))
+
+        self.root.after(0, lambda: self.download_status_label.config(
+            text=f"{source_name}: {result['frames_ocr']} de {result['frames_sampled']} quadros lidos. Carregando..."))
+        self.root.after(100, self._load_downloaded, temp_dir, caption_text, paths, results)
+        return items
+
+    def _on_download_result(self, stream, idx, path, result):
+        """
+        Recebe, na thread do Tk, cada imagem baixada e lida. As imagens entram no
+        catálogo e o texto aparece na ordem do carrossel, como em `_on_chunk_done`:
+        uma imagem pronta fora de ordem aguarda as anteriores.
+        """
+        stream['done'][idx] = (path, result)
+        while stream['next'] in stream['done']:
+            path, result = stream['done'].pop(stream['next'])
+            stream['next'] += 1
+            if isinstance(result, Exception) and not os.path.exists(path):
+                self.results_text.insert(tk.END, f"\nErro ao baixar {os.path.basename(path)}: {result}\n")
+                continue
+            # A legenda do post vai para a primeira imagem que entrar no catálogo
+            record = self.images_data.add(path, stream['caption'] if stream['first'] is None else '')
+            if record is None:
+                continue
+            if stream['first'] is None:
+                stream['first'] = record
+                self.current_preview_index = record.order - 1
+                self.show_preview()
+            self.update_status()
+            self._show_chunk_results([record], [result])
+
+    def _load_downloaded(self, temp_dir, caption_text, paths, results):
+        first_new_index = len(self.images_data)
+        self.load_images_from_folder(temp_dir, caption_text)
+
+        # O texto já extraído durante o download é exibido na ordem do carrossel
+        records, record_results = [], []
+        for path in paths:
+            record = self.images_data.get(path)
+            if record is None or record.order <= first_new_index:
+                if isinstance(results.get(path), Exception):
+                    self.results_text.insert(tk.END, f"\nErro ao baixar {os.path.basename(path)}: {results[path]}\n")
+                continue
+            if path in results:
+                records.append(record)
+                record_results.append(results[path])
+        self._show_chunk_results(records, record_results)
 
     def _handle_download_error(self, e):
         error_details = traceback.format_exc()
@@ -249,42 +872,18 @@ class CarouselTextExtractor:
         self.root.after(0, update_ui_with_error)
 
     def load_images_from_folder(self, folder_path, caption_text=""):
-        extensions = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
-        start_order = len(self.images_data) + 1
-        
-        newly_added_paths = [p for p in sorted(Path(folder_path).glob('*')) if p.suffix.lower() in extensions]
-
-        for idx, file_path in enumerate(newly_added_paths):
-            if not any(d['path'] == str(file_path) for d in self.images_data):
-                initial_text = caption_text if idx == 0 else ""
-                self.images_data.append({
-                    'path': str(file_path),
-                    'name': file_path.name,
-                    'order': start_order + idx,
-                    'text': initial_text
-                })
-        
-        self.update_status()
-        if newly_added_paths:
-            self.current_preview_index = len(self.images_data) - len(newly_added_paths)
-        self.show_preview()
+        self._add_images(scan_images(folder_path), caption_text)
 
     def load_images_from_files(self, file_paths):
-        start_order = len(self.images_data) + 1
-        
-        newly_added_paths = sorted(file_paths)
-        for idx, file_path in enumerate(newly_added_paths):
-            if not any(d['path'] == str(file_path) for d in self.images_data):
-                self.images_data.append({
-                    'path': file_path,
-                    'name': Path(file_path).name,
-                    'order': start_order + idx,
-                    'text': ''
-                })
-        
+        self._add_images(sorted(file_paths))
+
+    def _add_images(self, paths, first_text=""):
+        first_new_index = len(self.images_data)
+        added = self.images_data.add_many(paths, first_text)
+
         self.update_status()
-        if newly_added_paths:
-            self.current_preview_index = len(self.images_data) - len(newly_added_paths)
+        if added:
+            self.current_preview_index = first_new_index
         self.show_preview()
 
     def update_status(self):
@@ -303,11 +902,18 @@ class CarouselTextExtractor:
         img_data = self.images_data[self.current_preview_index]
         
         try:
-            img = Image.open(img_data['path'])
-            
             canvas_width = self.preview_canvas.winfo_width()
             canvas_height = self.preview_canvas.winfo_height()
-            img.thumbnail((canvas_width, canvas_height), Image.Resampling.LANCZOS if hasattr(Image, 'Resampling') else Image.ANTIALIAS)
+            size = (max(1, canvas_width), max(1, canvas_height))
+
+            # Miniatura do cache (JPEG decodificado já reduzido); as vizinhas são carregadas em segundo plano
+            img = self.preview_cache.get(img_data.path, size)
+            neighbors = [
+                self.images_data[i].path
+                for i in (self.current_preview_index + 1, self.current_preview_index - 1)
+                if 0 <= i < len(self.images_data)
+            ]
+            self.preview_cache.prefetch(neighbors, size)
             
             self.preview_photo = ImageTk.PhotoImage(img)
             
@@ -317,11 +923,20 @@ class CarouselTextExtractor:
             self.preview_canvas.create_image(x, y, anchor=tk.NW, image=self.preview_photo)
             
             self.preview_label.config(
-                text=f"{self.current_preview_index + 1}/{len(self.images_data)} - {img_data['name']}"
+                text=f"{self.current_preview_index + 1}/{len(self.images_data)} - {img_data.name}"
             )
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao carregar imagem: {str(e)}")
 
+    def _on_arrow_key(self, event):
+        # Não interfere na edição de texto (campo de URL, painel de resultados)
+        if isinstance(event.widget, (tk.Entry, ttk.Entry, tk.Text)):
+            return
+        if event.keysym == "Left":
+            self.prev_image()
+        else:
+            self.next_image()
+
     def prev_image(self):
         if self.images_data and self.current_preview_index > 0:
             self.current_preview_index -= 1
@@ -333,74 +948,129 @@ class CarouselTextExtractor:
             self.show_preview()
 
     def clean_text(self, text: str) -> str:
-        text = re.sub(r'\s+', ' ', text)
-        text = ''.join(char for char in text if char.isprintable() or char == '\n')
-        return text.strip()
+        return clean_text(text)
 
     def extract_text(self):
         if not self.images_data:
             messagebox.showwarning("Aviso", "Nenhuma imagem carregada!")
             return
-        
+
+        try:
+            workers = max(1, int(self.ocr_workers_var.get()))
+        except (tk.TclError, ValueError):
+            messagebox.showwarning("Aviso", "Informe um número válido de imagens em paralelo.")
+            return
+
         self.results_text.delete(1.0, tk.END)
         self.progress['maximum'] = len(self.images_data)
         self.progress['value'] = 0
-        
-        for idx, img_data in enumerate(self.images_data):
-            try:
-                img = Image.open(img_data['path'])
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                current_text = img_data.get('text', '')
-                ocr_text = pytesseract.image_to_string(img, lang='por')
-                cleaned_text = self.clean_text(ocr_text)
-                img_data['text'] = (current_text + "\n--- OCR ---\n" + cleaned_text).strip()
-                
-                result_entry = f"\n{'='*60}\n"
-                result_entry += f"Imagem {img_data['order']}: {img_data['name']}\n"
-                result_entry += f"{'-'*60}\n"
-                result_entry += f"{img_data['text'] if img_data['text'] else '[Nenhum texto detectado]'}\n"
-                
-                self.results_text.insert(tk.END, result_entry)
-                self.progress['value'] = idx + 1
-                self.root.update_idletasks()
-                
-            except Exception as e:
-                error_msg = f"\nErro na imagem {img_data['name']}: {str(e)}\n"
+        self.extract_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+
+        if self.ocr_runner is None:
+            self.ocr_runner = OCRRunner()
+
+        self.extraction_id += 1
+        self.cancel_event = threading.Event()
+        self._done_chunks = {}
+        self._next_index = 0
+        self._processed = 0
+
+        thread = threading.Thread(
+            target=self._run_extraction,
+            args=(self.extraction_id, list(self.images_data), workers, self.cancel_event)
+        )
+        thread.daemon = True
+        thread.start()
+
+    def _run_extraction(self, extraction_id, items, workers, cancel_event):
+        """
+        Executa o OCR em um pool de threads, fora da thread do Tk.
+        Cada grupo concluído é entregue à interface via `root.after`.
+        """
+        paths = [img_data.path for img_data in items]
+        for start, results in self.ocr_runner.run(paths, workers, cancel_event):
+            chunk = items[start:start + len(results)]
+            self.root.after(0, self._on_chunk_done, extraction_id, start, chunk, results)
+            # Imagens locais vão para o índice de busca pelo caminho; as baixadas já
+            # foram indexadas pela URL do post
+            self.ocr_runner.index_texts(DESKTOP_COLLECTION, [
+                (os.path.abspath(img_data.path), img_data.order, img_data.name, '', result)
+                for img_data, result in zip(chunk, results)
+                if not isinstance(result, Exception) and not self._is_downloaded(img_data.path)
+            ])
+        self.root.after(0, self._on_extraction_finished, extraction_id, cancel_event.is_set())
+
+    def _is_downloaded(self, path):
+        return any(path.startswith(temp_dir + os.sep) for temp_dir in self.temp_dirs)
+
+    def _on_chunk_done(self, extraction_id, start, chunk, results):
+        if extraction_id != self.extraction_id:
+            return
+        self._processed += len(chunk)
+        self.progress['value'] = self._processed
+
+        # Os resultados são exibidos na ordem do carrossel, mesmo que os grupos terminem fora de ordem
+        self._done_chunks[start] = (chunk, results)
+        while self._next_index in self._done_chunks:
+            ready_chunk, ready_results = self._done_chunks.pop(self._next_index)
+            self._show_chunk_results(ready_chunk, ready_results)
+            self._next_index += len(ready_chunk)
+
+    def _show_chunk_results(self, chunk, results):
+        for img_data, result in zip(chunk, results):
+            if isinstance(result, Exception):
+                error_msg = f"\nErro na imagem {img_data.name}: {str(result)}\n"
                 self.results_text.insert(tk.END, error_msg)
-        
-        messagebox.showinfo("Concluído", f"Extração concluída! {len(self.images_data)} imagens processadas.")
+                continue
+
+            img_data.text = (img_data.text + "\n--- OCR ---\n" + result).strip()
+
+            result_entry = f"\n{'='*60}\n"
+            result_entry += f"Imagem {img_data.order}: {img_data.name}\n"
+            result_entry += f"{'-'*60}\n"
+            result_entry += f"{img_data.text if img_data.text else '[Nenhum texto detectado]'}\n"
+
+            self.results_text.insert(tk.END, result_entry)
+
+    def _on_extraction_finished(self, extraction_id, cancelled):
+        if extraction_id != self.extraction_id:
+            return
+        # Após um cancelamento, mostra os grupos já concluídos que aguardavam um anterior
+        for idx in sorted(self._done_chunks):
+            self._show_chunk_results(*self._done_chunks.pop(idx))
+        self.extract_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.cancel_event = None
+        if cancelled:
+            messagebox.showinfo("Cancelado", f"Extração cancelada. {self._processed} imagens processadas.")
+        else:
+            messagebox.showinfo("Concluído", f"Extração concluída! {self._processed} imagens processadas.")
+
+    def cancel_extraction(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
 
     def save_csv(self):
-        if not self.images_data or not any(img['text'] for img in self.images_data):
+        if not self.images_data.has_text():
             messagebox.showwarning("Aviso", "Nenhum texto extraído ainda!")
             return
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV", "*.csv"), ("Todos", "*.*")]
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet"), ("Todos", "*.*")]
         )
         
         if file_path:
             try:
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(['Ordem', 'Imagem', 'Texto Extraído'])
-                    
-                    for img_data in self.images_data:
-                        writer.writerow([
-                            img_data['order'],
-                            img_data['name'],
-                            img_data['text']
-                        ])
-                
+                export_records(file_path, self.images_data)
                 messagebox.showinfo("Sucesso", f"CSV salvo em:\n{file_path}")
             except Exception as e:
                 messagebox.showerror("Erro", f"Erro ao salvar CSV: {str(e)}")
 
     def save_excel(self):
-        if not self.images_data or not any(img['text'] for img in self.images_data):
+        if not self.images_data.has_text():
             messagebox.showwarning("Aviso", "Nenhum texto extraído ainda!")
             return
         
@@ -411,22 +1081,20 @@ class CarouselTextExtractor:
         
         if file_path:
             try:
-                df = pd.DataFrame([
-                    {
-                        'Ordem no Carrossel': img['order'],
-                        'Imagem': img['name'],
-                        'Texto Extraído': img['text']
-                    }
-                    for img in self.images_data
-                ])
-                
-                df.to_excel(file_path, index=False, engine='openpyxl')
+                export_records(file_path, self.images_data, 'xlsx')
                 messagebox.showinfo("Sucesso", f"Excel salvo em:\n{file_path}")
             except Exception as e:
                 messagebox.showerror("Erro", f"Erro ao salvar Excel: {str(e)}")
 
     def clear_all(self):
-        self.images_data = []
+        # Interrompe uma extração em andamento; seus resultados serão ignorados
+        self.cancel_extraction()
+        self.extraction_id += 1
+        self.extract_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.cancel_event = None
+        self.images_data.clear()
+        self.preview_cache.clear()
         self.current_preview_index = 0
         self.results_text.delete(1.0, tk.END)
         self.preview_canvas.delete("all")
@@ -436,7 +1104,40 @@ class CarouselTextExtractor:
         self._cleanup_temp_dirs()
         self.temp_dirs = []
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extrator de Texto de Carrosséis")
+    parser.add_argument('--input', metavar='PASTA', help="pasta com as imagens (ativa o modo headless, sem interface gráfica)")
+    parser.add_argument('--video', metavar='ARQUIVO', help="vídeo local cujo texto nos quadros será extraído (modo headless)")
+    parser.add_argument('--urls', metavar='ARQUIVO', help="arquivo com URLs de posts, uma por linha (modo headless em lote)")
+    parser.add_argument('--output', metavar='ARQUIVO', help="arquivo de saída (.csv, .jsonl, .parquet ou .xlsx) do modo headless")
+    parser.add_argument('--workers', type=int, help="imagens processadas em paralelo (padrão: OCR_WORKERS ou nº de CPUs)")
+    parser.add_argument('--download-dir', metavar='PASTA', default='downloads',
+                        help="pasta onde os posts de --urls são salvos (padrão: downloads)")
+    parser.add_argument('--checkpoint', metavar='ARQUIVO',
+                        help="posts já concluídos de --urls (padrão: DOWNLOAD_DIR/checkpoint.txt)")
+    parser.add_argument('--concurrency', type=int, help="posts de --urls em andamento ao mesmo tempo (padrão: INGEST_CONCURRENCY)")
+    parser.add_argument('--collection', help="coleção do índice de busca (padrão: nome da pasta, da lista de URLs ou do vídeo)")
+    args = parser.parse_args(argv)
+
+    if args.video:
+        if args.input or args.urls or not args.output:
+            parser.error("--video deve ser usado com --output (e sem --input ou --urls)")
+        return run_video(args.video, args.output, args.collection)
+
+    if args.urls:
+        if args.input or not args.output:
+            parser.error("--urls deve ser usado com --output (e sem --input)")
+        return run_bulk(args.urls, args.output, args.download_dir, args.workers, args.concurrency, args.checkpoint,
+                        args.collection)
+
+    if args.input or args.output:
+        if not (args.input and args.output):
+            parser.error("--input e --output devem ser usados juntos")
+        return run_headless(args.input, args.output, args.workers, args.collection)
+
+    import pytesseract
+
+    _load_gui_modules()
     try:
         pytesseract.get_tesseract_version()
     except Exception as e:
@@ -445,11 +1146,11 @@ def main():
             f"Tesseract OCR não encontrado ou não configurado corretamente.\n\nErro: {e}\n\n"
             "Por favor, instale o Tesseract e adicione-o ao PATH do sistema."
         )
-        return
+        return 1
     
     root = tk.Tk()
     app = CarouselTextExtractor(root)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
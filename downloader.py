@@ -0,0 +1,156 @@
+"""
+Download concorrente de mídias, com sessão HTTP compartilhada e encadeamento direto no OCR.
+
+- Uma única `requests.Session` por processo, com pool de conexões dimensionado
+  para os downloads paralelos (conexões keep-alive reaproveitadas entre imagens);
+- Downloads limitados a `DOWNLOAD_WORKERS` simultâneos, com novas tentativas e
+  espera exponencial em falhas de rede e respostas 429/5xx;
+- Cada arquivo é gravado em um temporário e renomeado ao final, então quem o
+  recebe nunca vê um arquivo pela metade;
+- `download_and_process` entrega cada imagem ao OCR assim que ela chega, de
+  modo que o primeiro texto sai após um download e um OCR, não após o carrossel inteiro.
+
+Nada aqui depende de um domínio específico: as funções recebem URLs e uma
+sessão opcional, e podem ser exercitadas contra um servidor HTTP local
+(ex.: `python -m http.server`).
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 4))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", 3))
+DOWNLOAD_BACKOFF = float(os.getenv("DOWNLOAD_BACKOFF", 0.5))
+DOWNLOAD_TIMEOUT = (float(os.getenv("DOWNLOAD_CONNECT_TIMEOUT", 5)), float(os.getenv("DOWNLOAD_READ_TIMEOUT", 30)))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = DOWNLOAD_WORKERS) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size * 2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Retorna a sessão HTTP compartilhada do processo (criada no primeiro uso).
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRY_STATUS
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+
+
+def download_file(url: str, destination, session: Optional[requests.Session] = None,
+                  retries: int = DOWNLOAD_RETRIES, backoff: float = DOWNLOAD_BACKOFF,
+                  timeout=DOWNLOAD_TIMEOUT) -> str:
+    """
+    Baixa `url` para `destination`, tentando de novo (com espera exponencial)
+    em erros de rede e respostas 429/5xx. Retorna o caminho gravado.
+    """
+    session = session or get_session()
+    destination = os.fspath(destination)
+    partial = destination + '.part'
+    for attempt in range(retries + 1):
+        try:
+            with session.get(url, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                with open(partial, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+            os.replace(partial, destination)
+            return destination
+        except requests.RequestException as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            if attempt == retries or not _is_retryable(e):
+                raise
+            retry_after = None
+            if isinstance(e, requests.HTTPError) and e.response is not None:
+                retry_after = e.response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff * (2 ** attempt)
+            time.sleep(delay)
+
+
+def download_all(jobs: Sequence[Tuple[str, str]],
+                 on_downloaded: Optional[Callable[[int, Union[str, Exception]], None]] = None,
+                 workers: int = DOWNLOAD_WORKERS, session: Optional[requests.Session] = None,
+                 cancel_event: Optional[threading.Event] = None) -> List[Union[str, Exception]]:
+    """
+    Baixa os pares (url, destino) em paralelo. `on_downloaded(índice, caminho ou exceção)`
+    é chamado, na thread que chamou esta função, assim que cada arquivo termina.
+    Retorna os resultados na ordem de `jobs`.
+    """
+    session = session or get_session()
+    results: List[Union[str, Exception, None]] = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='download') as executor:
+        futures = {executor.submit(download_file, url, dest, session): idx for idx, (url, dest) in enumerate(jobs)}
+        try:
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    results[idx] = e
+                if on_downloaded is not None:
+                    on_downloaded(idx, results[idx])
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+        finally:
+            for pending in futures:
+                pending.cancel()
+    return results
+
+
+def download_and_process(jobs: Sequence[Tuple[str, str]], process: Callable[[str], object],
+                         on_result: Callable[[int, str, object], None],
+                         download_workers: int = DOWNLOAD_WORKERS, process_workers: int = 1,
+                         session: Optional[requests.Session] = None,
+                         cancel_event: Optional[threading.Event] = None):
+    """
+    Encadeia download e processamento (ex.: OCR): cada arquivo é enviado a
+    `process(caminho)` assim que termina de baixar, em um pool próprio de
+    `process_workers` threads. `on_result(índice, caminho, resultado ou exceção)`
+    é chamado quando cada item termina; falhas de download também passam por ele.
+    Retorna quando todos os itens tiverem terminado.
+    """
+    # Ao sair do bloco, o pool aguarda o processamento dos arquivos já entregues
+    with ThreadPoolExecutor(max_workers=max(1, process_workers), thread_name_prefix='process') as process_pool:
+        def run(idx, path):
+            try:
+                result = process(path)
+            except Exception as e:
+                result = e
+            on_result(idx, path, result)
+
+        def on_downloaded(idx, downloaded):
+            if isinstance(downloaded, Exception):
+                on_result(idx, jobs[idx][1], downloaded)
+                return
+            process_pool.submit(run, idx, downloaded)
+
+        download_all(jobs, on_downloaded, download_workers, session, cancel_event)
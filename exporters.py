@@ -0,0 +1,166 @@
+"""
+Exportação dos textos extraídos, linha a linha.
+
+Cada formato grava as linhas à medida que chegam, sem montar a tabela inteira
+em memória, então um job de 100 mil imagens exporta com uso de memória constante:
+
+- CSV e JSONL: cada linha vai para o disco assim que é escrita; se o processo
+  morrer no meio, o arquivo parcial continua legível até a última linha;
+- XLSX: `openpyxl` em modo write-only, que despeja as linhas em um arquivo
+  temporário em vez de mantê-las na planilha;
+- Parquet (`pyarrow`): as linhas são agrupadas em row groups de
+  `EXPORT_PARQUET_ROW_GROUP` linhas.
+
+XLSX e Parquet só têm o índice (rodapé) gravado ao fechar; até lá são escritos
+em `<arquivo>.part`, de modo que uma falha nunca deixa um arquivo corrompido
+com o nome final. Para arquivos parciais legíveis após uma falha, use CSV ou JSONL.
+"""
+
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, Optional
+
+EXPORT_PARQUET_ROW_GROUP = int(os.getenv("EXPORT_PARQUET_ROW_GROUP", 1000))
+
+
+class Exporter(ABC):
+    """
+    Base dos exportadores: `write(ordem, imagem, texto)` para cada linha e `close()`
+    ao final (também utilizável como gerenciador de contexto).
+    """
+
+    def __init__(self, file_path):
+        self.file_path = os.fspath(file_path)
+        self.rows = 0
+
+    def write(self, order: int, name: str, text: str):
+        self._write(order, name, text or '')
+        self.rows += 1
+
+    def write_record(self, record):
+        self.write(record.order, record.name, record.text)
+
+    @abstractmethod
+    def _write(self, order: int, name: str, text: str):
+        ...
+
+    @abstractmethod
+    def close(self):
+        ...
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CSVExporter(Exporter):
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self._file = open(self.file_path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['Ordem', 'Imagem', 'Texto Extraído'])
+
+    def _write(self, order, name, text):
+        self._writer.writerow([order, name, text])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JSONLExporter(Exporter):
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self._file = open(self.file_path, 'w', encoding='utf-8')
+
+    def _write(self, order, name, text):
+        self._file.write(json.dumps({'order': order, 'image': name, 'text': text}, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class XLSXExporter(Exporter):
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        from openpyxl import Workbook
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+        self._illegal = ILLEGAL_CHARACTERS_RE
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._sheet.append(['Ordem no Carrossel', 'Imagem', 'Texto Extraído'])
+
+    def _write(self, order, name, text):
+        # Caracteres de controle que o OCR às vezes devolve são inválidos no XML da planilha
+        self._sheet.append([order, name, self._illegal.sub('', text)])
+
+    def close(self):
+        partial = self.file_path + '.part'
+        self._workbook.save(partial)
+        os.replace(partial, self.file_path)
+
+
+class ParquetExporter(Exporter):
+    def __init__(self, file_path, row_group_size: int = EXPORT_PARQUET_ROW_GROUP):
+        super().__init__(file_path)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([('order', pa.int64()), ('image', pa.string()), ('text', pa.string())])
+        self._partial = self.file_path + '.part'
+        self._writer = pq.ParquetWriter(self._partial, self._schema)
+        self._row_group_size = max(1, row_group_size)
+        self._buffer = {'order': [], 'image': [], 'text': []}
+
+    def _write(self, order, name, text):
+        self._buffer['order'].append(order)
+        self._buffer['image'].append(name)
+        self._buffer['text'].append(text)
+        if len(self._buffer['order']) >= self._row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer['order']:
+            self._writer.write_table(self._pa.Table.from_pydict(self._buffer, schema=self._schema))
+            self._buffer = {'order': [], 'image': [], 'text': []}
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        os.replace(self._partial, self.file_path)
+
+
+EXPORTERS = {
+    '.csv': CSVExporter,
+    '.jsonl': JSONLExporter,
+    '.ndjson': JSONLExporter,
+    '.xlsx': XLSXExporter,
+    '.parquet': ParquetExporter,
+}
+
+
+def open_exporter(file_path, fmt: Optional[str] = None) -> Exporter:
+    """
+    Abre o exportador correspondente à extensão do arquivo (ou a `fmt`, ex.: 'jsonl').
+    Extensões desconhecidas são exportadas como CSV.
+    """
+    suffix = f".{fmt.lower().lstrip('.')}" if fmt else Path(file_path).suffix.lower()
+    return EXPORTERS.get(suffix, CSVExporter)(file_path)
+
+
+def export_records(file_path, records: Iterable, fmt: Optional[str] = None) -> int:
+    """
+    Exporta os registros (com `order`, `name` e `text`) de uma vez. Retorna o número de linhas.
+    """
+    with open_exporter(file_path, fmt) as exporter:
+        for record in records:
+            exporter.write_record(record)
+        return exporter.rows
@@ -0,0 +1,106 @@
+"""
+Catálogo de imagens da aplicação desktop.
+
+Substitui a lista de dicionários por registros compactos (`__slots__`) e um
+índice por caminho, de modo que verificar duplicatas custa O(1) e carregar
+uma pasta com dezenas de milhares de imagens continua linear. A leitura das
+pastas usa `os.scandir`, sem criar um objeto `Path` por arquivo.
+"""
+
+import os
+from typing import Iterable, Iterator, List, Optional
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+
+class ImageRecord:
+    """
+    Uma imagem do catálogo: caminho, nome, posição no carrossel e texto extraído.
+    """
+
+    __slots__ = ('path', 'name', 'order', 'text')
+
+    def __init__(self, path: str, name: str, order: int, text: str = ''):
+        self.path = path
+        self.name = name
+        self.order = order
+        self.text = text
+
+    def __repr__(self):
+        return f"ImageRecord(order={self.order}, name={self.name!r})"
+
+
+def _index_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def scan_images(folder_path) -> List[str]:
+    """
+    Lista, em ordem alfabética, os caminhos das imagens com extensão suportada dentro da pasta.
+    """
+    names = []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                names.append(entry.name)
+    names.sort()
+    folder = os.fspath(folder_path)
+    return [os.path.join(folder, name) for name in names]
+
+
+class ImageCatalog:
+    """
+    Sequência ordenada de `ImageRecord` com busca por caminho.
+
+    Suporta `len`, iteração, indexação (inclusive fatias) e `in` com um caminho.
+    """
+
+    def __init__(self):
+        self._records: List[ImageRecord] = []
+        self._index = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[ImageRecord]:
+        return iter(self._records)
+
+    def __getitem__(self, item):
+        return self._records[item]
+
+    def __contains__(self, path) -> bool:
+        return _index_key(os.fspath(path)) in self._index
+
+    def get(self, path) -> Optional[ImageRecord]:
+        return self._index.get(_index_key(os.fspath(path)))
+
+    def add(self, path, text: str = '') -> Optional[ImageRecord]:
+        """
+        Acrescenta a imagem ao final do catálogo. Retorna None se o caminho já estiver presente.
+        """
+        path = os.fspath(path)
+        key = _index_key(path)
+        if key in self._index:
+            return None
+        record = ImageRecord(path, os.path.basename(path), len(self._records) + 1, text)
+        self._records.append(record)
+        self._index[key] = record
+        return record
+
+    def add_many(self, paths: Iterable, first_text: str = '') -> int:
+        """
+        Acrescenta vários caminhos, ignorando duplicatas. `first_text` (ex.: a legenda
+        de um post) vai para a primeira imagem nova. Retorna quantas foram adicionadas.
+        """
+        added = 0
+        for path in paths:
+            if self.add(path, first_text if added == 0 else '') is not None:
+                added += 1
+        return added
+
+    def has_text(self) -> bool:
+        return any(record.text for record in self._records)
+
+    def clear(self):
+        self._records.clear()
+        self._index.clear()
@@ -0,0 +1,205 @@
+"""
+Métricas de desempenho do OCR: histogramas de tempo por etapa, contadores e
+medidores, no formato de texto do Prometheus (servido em `/metrics` pela API).
+
+Não depende do `prometheus_client`: são poucos histogramas com baldes fixos,
+atualizados sob um lock, e o texto é montado só quando alguém consulta.
+
+Etapas medidas (rótulo `stage` de `vx9_ocr_stage_seconds`):
+
+- upload_read: leitura do upload (API);
+- preprocess: decodificação e pré-processamento (`prepare_for_ocr`), por imagem;
+- recognize: execução do motor de OCR, por chamada (uma imagem ou um lote);
+- bulk_fallback: lotes do motor `cli` refeitos imagem a imagem (parte de `recognize`),
+  contados também em `vx9_ocr_bulk_fallbacks_total`;
+- split: divisão de imagens altas em tiras;
+- clean_text: limpeza do texto reconhecido;
+- pool_wait: espera na fila do pool de processos mais a transferência dos dados (API).
+
+As etapas executadas nos processos do pool da API são acumuladas lá
+(`collect_stages`) e registradas no processo principal quando o resultado
+volta (`record_stages`); nos demais casos vão direto para o histograma.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Limites superiores dos baldes, em segundos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def _labels(name: Optional[str], value: str, extra: str = '') -> str:
+    parts = []
+    if name is not None:
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Histogram:
+    """
+    Histograma cumulativo com no máximo um rótulo (ex.: `stage`).
+    """
+
+    def __init__(self, name: str, help_text: str, label: Optional[str] = None,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        # valor do rótulo -> [contagens por balde..., soma, total]
+        self._series: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label: str = ''):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Total de observações, soma e média por valor do rótulo.
+        """
+        with self._lock:
+            return {
+                label: {"count": series[-1], "sum": series[-2], "mean": series[-2] / series[-1] if series[-1] else 0.0}
+                for label, series in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {label: list(values) for label, values in self._series.items()}
+        for label, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                bucket = _labels(self.label, label, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            bucket = _labels(self.label, label, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label)} {_format_value(float(values[-2]))}")
+            lines.append(f"{self.name}_count{_labels(self.label, label)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    """
+    Contador monotônico com no máximo um rótulo.
+    """
+
+    def __init__(self, name: str, help_text: str, label: Optional[str] = None):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        # Sem rótulo, a série existe desde o início (valor 0), como o Prometheus espera
+        self._values: Dict[str, float] = {} if label else {'': 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, label: str = ''):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.label, label)} {_format_value(value)}")
+        return lines
+
+
+def sample_lines(name: str, help_text: str, metric_type: str,
+                 samples: Union[float, Dict[str, float]], label: Optional[str] = None) -> List[str]:
+    """
+    Linhas de uma métrica calculada na hora da consulta (ex.: profundidade da fila,
+    contadores do cache): um valor, ou um dicionário valor do rótulo -> valor.
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    if isinstance(samples, dict):
+        for label_value, value in samples.items():
+            lines.append(f"{name}{_labels(label, label_value)} {_format_value(value)}")
+    else:
+        lines.append(f"{name} {_format_value(samples)}")
+    return lines
+
+
+STAGE_SECONDS = Histogram("vx9_ocr_stage_seconds", "Tempo gasto em cada etapa do OCR.", "stage")
+BULK_FALLBACKS = Counter("vx9_ocr_bulk_fallbacks_total",
+                         "Lotes do motor cli que falharam e foram refeitos imagem a imagem.")
+
+# Etapas acumuladas neste processo enquanto `collect_stages` está ativo (processos do pool)
+_collected: Optional[List[Tuple[str, float]]] = None
+
+
+def _observe(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, name)
+    # Contado aqui, e não no motor, para incluir os lotes refeitos nos processos do pool
+    if name == 'bulk_fallback':
+        BULK_FALLBACKS.inc()
+
+
+def record_stage(name: str, seconds: float):
+    if _collected is not None:
+        _collected.append((name, seconds))
+    else:
+        _observe(name, seconds)
+
+
+def record_stages(stages: Iterable[Tuple[str, float]]):
+    for name, seconds in stages:
+        _observe(name, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mede o bloco como a etapa `name`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def collect_stages(fn, *args):
+    """
+    Executa `fn(*args)` acumulando as etapas medidas, em vez de registrá-las aqui.
+    Roda dentro dos processos do pool: retorna (resultado, etapas, segundos totais),
+    para que o processo principal registre as etapas e calcule a espera na fila.
+    """
+    global _collected
+    _collected = []
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+        return result, _collected, time.perf_counter() - start
+    finally:
+        _collected = None
+
+
+def render(sections: Iterable[List[str]]) -> str:
+    return '\n'.join(line for section in sections for line in section) + '\n'
@@ -0,0 +1,250 @@
+"""
+Cache de resultados de OCR endereçado por conteúdo.
+
+A chave é o hash SHA-256 dos bytes da imagem combinado com o idioma e a
+configuração do OCR, de modo que reenvios da mesma imagem (mesmo com outro
+nome) reaproveitam o texto já extraído. Há dois níveis: um LRU em memória,
+limitado pelo tamanho total dos textos, na frente de um SQLite em disco que
+sobrevive entre execuções e é compartilhado pela API e pela aplicação desktop.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+DEFAULT_MEMORY_BYTES = int(float(os.getenv("OCR_CACHE_MEMORY_MB", 64)) * 1024 * 1024)
+DEFAULT_DB_PATH = os.getenv("OCR_CACHE_DB", str(Path.home() / ".cache" / "vx9" / "ocr_cache.sqlite3"))
+
+
+def make_key(data: bytes, lang: str = 'por', config: str = '') -> str:
+    """
+    Gera a chave do cache a partir dos bytes da imagem, do idioma e da configuração do OCR.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}:{lang}:{config}"
+
+
+def make_file_key(path, lang: str = 'por', config: str = '') -> str:
+    """
+    Igual a `make_key`, mas lê o arquivo em blocos, sem carregá-lo inteiro na memória.
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return f"{sha.hexdigest()}:{lang}:{config}"
+
+
+class OCRCache:
+    """
+    Cache em dois níveis (memória LRU + SQLite) para textos extraídos por OCR.
+
+    É seguro para uso a partir de várias threads. Requisições simultâneas para
+    a mesma chave são agrupadas: apenas a primeira executa o OCR e as demais
+    aguardam o mesmo resultado (`claim`/`resolve` nas threads da aplicação
+    desktop, `aget_or_compute` no event loop da API).
+    """
+
+    def __init__(self, max_memory_bytes: int = DEFAULT_MEMORY_BYTES, db_path: Optional[str] = DEFAULT_DB_PATH):
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._ainflight = {}
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS ocr_cache (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+            self._db.commit()
+
+    @staticmethod
+    def _entry_size(key: str, text: str) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(text)
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        # Chamado com self._lock adquirido
+        text = self._memory.get(key)
+        if text is not None:
+            self._memory.move_to_end(key)
+        return text
+
+    def _memory_put(self, key: str, text: str):
+        size = self._entry_size(key, text)
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= self._entry_size(key, old)
+            self._memory[key] = text
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                old_key, old_text = self._memory.popitem(last=False)
+                self._memory_bytes -= self._entry_size(old_key, old_text)
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _disk_put(self, key: str, text: str):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO ocr_cache (key, text) VALUES (?, ?)", (key, text))
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Procura a chave na memória e depois no disco. Retorna None em caso de falha.
+        """
+        with self._lock:
+            text = self._memory_get(key)
+            if text is not None:
+                self.hits_memory += 1
+                return text
+        text = self._disk_get(key)
+        with self._lock:
+            if text is not None:
+                self.hits_disk += 1
+            else:
+                self.misses += 1
+        if text is not None:
+            self._memory_put(key, text)
+        return text
+
+    def put(self, key: str, text: str):
+        self._memory_put(key, text)
+        self._disk_put(key, text)
+
+    def claim(self, key: str) -> Optional[Future]:
+        """
+        Reserva o cálculo de `key` para quem chamou, depois de um `get` sem sucesso.
+        Retorna None se ele deve executar o OCR e em seguida chamar `resolve` (sempre,
+        mesmo em caso de erro), ou um Future com o resultado de quem já está
+        calculando a mesma chave (ou já calculou desde o `get`).
+        """
+        with self._lock:
+            text = self._memory_get(key)
+            if text is not None:
+                done = Future()
+                done.set_result(text)
+                return done
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return pending
+            self._inflight[key] = Future()
+            return None
+
+    def resolve(self, key: str, result):
+        """
+        Conclui um cálculo reservado com `claim`: `result` é o texto, que vai para o
+        cache, ou a exceção, repassada a quem aguardava.
+        """
+        if not isinstance(result, BaseException):
+            self.put(key, result)
+        with self._lock:
+            pending = self._inflight.pop(key)
+        if isinstance(result, BaseException):
+            pending.set_exception(result)
+        else:
+            pending.set_result(result)
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """
+        Retorna o texto em cache ou executa `compute()` uma única vez por chave,
+        mesmo com várias requisições pedindo a mesma imagem ao mesmo tempo (event loop da API).
+
+        Se o dono do cálculo for cancelado (ex.: o cliente de um lote desconectou),
+        quem aguardava não é cancelado junto: o primeiro a acordar assume o cálculo
+        e os demais passam a aguardá-lo.
+        """
+        coalesced = False
+        while True:
+            with self._lock:
+                text = self._memory_get(key)
+                if text is not None:
+                    self.hits_memory += 1
+                    return text
+                pending = self._ainflight.get(key)
+                if pending is not None and not coalesced:
+                    self.coalesced += 1
+                    coalesced = True
+
+            if pending is None:
+                break
+            try:
+                # shield: o cancelamento de quem espera não deve cancelar o OCR do dono
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Só tenta de novo se quem foi cancelado é o dono, e não esta tarefa
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        pending = self._ainflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            text = await asyncio.to_thread(self._disk_get, key)
+            with self._lock:
+                if text is not None:
+                    self.hits_disk += 1
+                else:
+                    self.misses += 1
+            if text is not None:
+                self._memory_put(key, text)
+            else:
+                text = await compute()
+                await asyncio.to_thread(self.put, key, text)
+            pending.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except BaseException as e:
+            pending.set_exception(e)
+            # Evita o aviso de "exception was never retrieved" quando ninguém aguardava
+            pending.exception()
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_enabled": self._db is not None,
+            }
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
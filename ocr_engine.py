@@ -0,0 +1,425 @@
+"""
+Chamada direta ao Tesseract, sem o ciclo PIL → PNG temporário → tesseract.
+
+O `pytesseract.image_to_string` recebe um `Image` já decodificado e o regrava
+em um arquivo PNG temporário antes de iniciar o tesseract. Aqui, quando o
+formato original já é lido pelo Tesseract (PNG, JPEG, TIFF, BMP, PNM), os bytes
+vão direto pela entrada padrão (ou o caminho do arquivo é passado como está).
+Nos demais casos a imagem é decodificada uma vez e entregue como PNM sem
+compressão, também pela entrada padrão, sem tocar no disco.
+
+Sobre essa chamada há uma camada de motores (`get_engine`) usada pela API e
+pela aplicação desktop:
+
+- `cli`: um processo do tesseract por imagem, ou um único processo para um
+  lote inteiro (`recognize_many`), usando a entrada em lista de arquivos do
+  tesseract, de modo que o modelo do idioma é carregado uma só vez por lote;
+- `tesserocr`: mantém a API do Tesseract carregada na memória (uma instância
+  por thread), sem custo de inicialização por imagem. Requer o pacote opcional
+  `tesserocr`.
+
+O motor é escolhido por `OCR_ENGINE` (`auto`, `cli` ou `tesserocr`); `auto`
+usa o tesserocr quando está instalado.
+
+Os dois motores também geram a saída TSV (`recognize_tsv`), da qual `ocr_layout` tira texto, palavras com caixa e confiança e a estrutura
+de linhas e parágrafos, na mesma execução do reconhecimento.
+"""
+
+import io
+import os
+import shlex
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional, Union
+
+import pytesseract
+from PIL import Image
+
+from metrics import stage
+from ocr_layout import empty_layout, parse_tsv, scale_layout
+from preprocessing import prepare_for_ocr
+
+# Assinaturas dos formatos que o Tesseract (via Leptonica) lê diretamente
+NATIVE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'II*\x00', 'TIFF'),
+    (b'MM\x00*', 'TIFF'),
+    (b'BM', 'BMP'),
+    (b'P4', 'PNM'),
+    (b'P5', 'PNM'),
+    (b'P6', 'PNM'),
+)
+
+ImageSource = Union[bytes, str, os.PathLike, Image.Image]
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+# Quantas imagens pequenas são agrupadas em uma única chamada de recognize_many
+OCR_BULK_SIZE = int(os.getenv("OCR_BULK_SIZE", 8))
+
+# Separador de páginas usado para dividir a saída de uma chamada em lote
+PAGE_SEPARATOR = "@@VX9-PAGE@@"
+
+# Mensagens do Tesseract/Leptonica quando a imagem de entrada não pôde ser decodificada
+UNREADABLE_MARKERS = ("pixRead", "cannot be read", "Unsupported image type")
+
+TSV_HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """
+    Identifica pelo cabeçalho se os bytes estão em um formato lido nativamente pelo Tesseract.
+    """
+    for signature, name in NATIVE_SIGNATURES:
+        if header.startswith(signature):
+            return name
+    return None
+
+
+def to_pnm(img: Image.Image) -> bytes:
+    """
+    Converte uma imagem para PNM (PGM/PPM) sem compressão, o formato mais barato de gerar.
+    """
+    if img.mode not in ('L', 'RGB'):
+        img = img.convert('RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, format='PPM')
+    return buffer.getvalue()
+
+
+def run_tesseract(input_name: str, stdin: Optional[bytes] = None, lang: str = 'por',
+                  config: str = '', extension: str = 'txt', timeout: Optional[float] = None) -> str:
+    """
+    Executa o binário do Tesseract e retorna a saída padrão decodificada.
+
+    `input_name` é um caminho de arquivo ou "stdin" (nesse caso os bytes vêm em `stdin`).
+    """
+    cmd = [pytesseract.pytesseract.tesseract_cmd, input_name, 'stdout', '-l', lang]
+    cmd += config.split()
+    if extension != 'txt':
+        cmd.append(extension)
+    # Várias imagens já rodam em paralelo (pool da API, threads do desktop); sem isso,
+    # cada tesseract também abriria várias threads OpenMP e elas disputariam os núcleos
+    env = os.environ.copy()
+    env.setdefault('OMP_THREAD_LIMIT', '1')
+    try:
+        proc = subprocess.run(cmd, input=stdin, capture_output=True, timeout=timeout, env=env)
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    if proc.returncode != 0:
+        message = proc.stderr.decode('utf-8', errors='replace').strip()
+        raise pytesseract.TesseractError(proc.returncode, message)
+    return proc.stdout.decode('utf-8', errors='replace')
+
+
+def unreadable_input(error: Exception) -> bool:
+    """
+    Indica se o erro do Tesseract foi a Leptonica não conseguir decodificar a imagem.
+    """
+    message = str(error)
+    return any(marker in message for marker in UNREADABLE_MARKERS)
+
+
+def image_to_text(source: ImageSource, lang: str = 'por', config: str = '',
+                  timeout: Optional[float] = None, extension: str = 'txt') -> str:
+    """
+    Extrai o texto de uma imagem (bytes, caminho de arquivo ou `Image` do PIL),
+    ou outra saída do Tesseract conforme `extension` (ex.: 'tsv').
+
+    Formatos suportados pelo Tesseract seguem sem decodificação; os demais são
+    convertidos uma única vez para PNM. Se o Tesseract não conseguir decodificar os
+    bytes originais (ex.: uma variante de JPEG que a Leptonica não lê), tenta de
+    novo via PNM; outros erros (ex.: idioma inexistente) são repassados sem nova execução.
+    """
+    if isinstance(source, Image.Image):
+        return run_tesseract('stdin', to_pnm(source), lang, config, extension, timeout)
+
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        with open(path, 'rb') as f:
+            header = f.read(16)
+        if sniff_format(header):
+            try:
+                return run_tesseract(path, None, lang, config, extension, timeout)
+            except pytesseract.TesseractError as e:
+                if not unreadable_input(e):
+                    raise
+        with Image.open(path) as img:
+            return run_tesseract('stdin', to_pnm(img), lang, config, extension, timeout)
+
+    data = bytes(source)
+    if sniff_format(data[:16]):
+        try:
+            return run_tesseract('stdin', data, lang, config, extension, timeout)
+        except pytesseract.TesseractError as e:
+            if not unreadable_input(e):
+                raise
+    with Image.open(io.BytesIO(data)) as img:
+        return run_tesseract('stdin', to_pnm(img), lang, config, extension, timeout)
+
+
+class TesseractCLIEngine:
+    """
+    Motor baseado no binário do Tesseract.
+
+    `recognize` inicia um processo por imagem; `recognize_many` processa um
+    lote inteiro em uma só execução, passando uma lista de arquivos.
+    """
+
+    name = 'cli'
+
+    def recognize(self, source: ImageSource, lang: str = 'por', config: str = '') -> str:
+        return image_to_text(source, lang=lang, config=config)
+
+    def recognize_tsv(self, source: ImageSource, lang: str = 'por', config: str = '') -> str:
+        return image_to_text(source, lang=lang, config=config, extension='tsv')
+
+    def recognize_many(self, sources: List[ImageSource], lang: str = 'por', config: str = '') -> List[Union[str, Exception]]:
+        """
+        Reconhece várias imagens em uma única execução do Tesseract.
+
+        Retorna um item por imagem, na mesma ordem: o texto ou a exceção daquela
+        imagem. Se a execução em lote falhar ou a saída não puder ser dividida,
+        cada imagem é processada individualmente para isolar o erro.
+        """
+        if len(sources) == 1:
+            return self._recognize_each(sources, lang, config)
+
+        with tempfile.TemporaryDirectory(prefix='vx9_bulk_') as temp_dir:
+            paths = []
+            try:
+                for idx, source in enumerate(sources):
+                    paths.append(self._as_native_file(source, temp_dir, idx))
+            except Exception:
+                return self._fallback(sources, lang, config)
+
+            list_file = os.path.join(temp_dir, 'images.txt')
+            with open(list_file, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(paths) + '\n')
+
+            bulk_config = f"-c page_separator={PAGE_SEPARATOR} {config}".strip()
+            try:
+                output = run_tesseract(list_file, None, lang, bulk_config)
+            except pytesseract.TesseractError:
+                return self._fallback(sources, lang, config)
+
+        pages = output.split(PAGE_SEPARATOR)
+        # Versões que escrevem o separador também depois da última página deixam uma parte vazia no fim
+        if len(pages) == len(sources) + 1 and not pages[-1].strip():
+            pages.pop()
+        if len(pages) != len(sources):
+            # Alguma imagem foi ignorada pelo tesseract; não dá para alinhar os resultados
+            return self._fallback(sources, lang, config)
+        return pages
+
+    def _fallback(self, sources, lang, config):
+        # Refaz o lote imagem a imagem. Mede como a etapa `bulk_fallback` (também contada em
+        # `vx9_ocr_bulk_fallbacks_total`) para que um lote que sempre cai aqui, e paga o OCR
+        # duas vezes, apareça nas métricas
+        with stage('bulk_fallback'):
+            return self._recognize_each(sources, lang, config)
+
+    def _recognize_each(self, sources, lang, config):
+        results = []
+        for source in sources:
+            try:
+                results.append(self.recognize(source, lang, config))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    @staticmethod
+    def _as_native_file(source: ImageSource, temp_dir: str, idx: int) -> str:
+        # Caminhos em formato nativo são usados como estão; o resto vira arquivo temporário
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            with open(path, 'rb') as f:
+                if sniff_format(f.read(16)):
+                    return os.path.abspath(path)
+            with Image.open(path) as img:
+                data = to_pnm(img)
+        elif isinstance(source, Image.Image):
+            data = to_pnm(source)
+        else:
+            data = bytes(source)
+            if not sniff_format(data[:16]):
+                with Image.open(io.BytesIO(data)) as img:
+                    data = to_pnm(img)
+        path = os.path.join(temp_dir, f'{idx:06d}.img')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class TesserocrEngine:
+    """
+    Motor que mantém a API do Tesseract aquecida (modelo do idioma já carregado).
+
+    A `PyTessBaseAPI` não é thread-safe, então cada thread tem a sua instância
+    por idioma; dentro dos processos do pool da API, ela vive enquanto o processo viver.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+
+    def _api(self, lang: str, config: str):
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+        api = apis.get((lang, config))
+        if api is None:
+            api = self._tesserocr.PyTessBaseAPI(lang=lang)
+            self._apply_config(api, config)
+            apis[(lang, config)] = api
+        return api
+
+    def _apply_config(self, api, config: str):
+        # Suporta o subconjunto usado pelo projeto: --psm N e -c variavel=valor
+        args = shlex.split(config)
+        for idx, arg in enumerate(args):
+            if arg == '--psm' and idx + 1 < len(args):
+                api.SetPageSegMode(int(args[idx + 1]))
+            elif arg == '-c' and idx + 1 < len(args) and '=' in args[idx + 1]:
+                name, value = args[idx + 1].split('=', 1)
+                api.SetVariable(name, value)
+
+    def _set_image(self, source: ImageSource, lang: str, config: str):
+        api = self._api(lang, config)
+        if isinstance(source, Image.Image):
+            api.SetImage(source)
+        elif isinstance(source, (str, os.PathLike)):
+            api.SetImageFile(os.fspath(source))
+        else:
+            with Image.open(io.BytesIO(source)) as img:
+                img.load()
+                api.SetImage(img)
+        return api
+
+    def recognize(self, source: ImageSource, lang: str = 'por', config: str = '') -> str:
+        return self._set_image(source, lang, config).GetUTF8Text()
+
+    def recognize_tsv(self, source: ImageSource, lang: str = 'por', config: str = '') -> str:
+        # O cabeçalho não vem do GetTSVText; é o mesmo que o binário do tesseract escreve
+        return TSV_HEADER + self._set_image(source, lang, config).GetTSVText(0)
+
+    def recognize_many(self, sources: List[ImageSource], lang: str = 'por', config: str = '') -> List[Union[str, Exception]]:
+        return self._recognize_each(sources, self.recognize, lang, config)
+
+    @staticmethod
+    def _recognize_each(sources, recognize, lang, config):
+        results = []
+        for source in sources:
+            try:
+                results.append(recognize(source, lang, config))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+ENGINES = {
+    'cli': TesseractCLIEngine,
+    'tesserocr': TesserocrEngine,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: Optional[str] = None):
+    """
+    Retorna o motor de OCR configurado (instância única por processo).
+
+    `auto` escolhe o tesserocr quando o pacote está instalado e o binário do
+    tesseract caso contrário.
+    """
+    name = name or OCR_ENGINE
+    with _engines_lock:
+        if name in _engines:
+            return _engines[name]
+        if name == 'auto':
+            try:
+                engine = TesserocrEngine()
+            except ImportError:
+                engine = TesseractCLIEngine()
+        elif name in ENGINES:
+            engine = ENGINES[name]()
+        else:
+            raise ValueError(f"Motor de OCR desconhecido: {name}. Opções: auto, {', '.join(ENGINES)}")
+        _engines[name] = engine
+        return engine
+
+
+def ocr_source(source: ImageSource, lang: str = 'por', engine=None) -> str:
+    """
+    Pré-processa (ver `preprocessing`) e reconhece uma imagem.
+    Slides vazios retornam texto vazio sem chamar o motor.
+    """
+    with stage('preprocess'):
+        prepared = prepare_for_ocr(source)
+    if prepared is None:
+        return ''
+    with stage('recognize'):
+        return (engine or get_engine()).recognize(prepared, lang=lang)
+
+
+def ocr_sources(sources: List[ImageSource], lang: str = 'por', engine=None) -> List[Union[str, Exception]]:
+    """
+    Versão em lote de `ocr_source`: as imagens não vazias vão juntas ao motor
+    (`recognize_many`). Retorna, na mesma ordem, o texto ou a exceção de cada imagem.
+    """
+    results = [None] * len(sources)
+    pending = []
+    for idx, source in enumerate(sources):
+        try:
+            with stage('preprocess'):
+                prepared = prepare_for_ocr(source)
+        except Exception as e:
+            results[idx] = e
+            continue
+        if prepared is None:
+            results[idx] = ''
+        else:
+            pending.append((idx, prepared))
+
+    if pending:
+        with stage('recognize'):
+            recognized = (engine or get_engine()).recognize_many([prepared for _, prepared in pending], lang=lang)
+        for (idx, _), result in zip(pending, recognized):
+            results[idx] = result
+    return results
+
+
+def _layout_from_tsv(source: ImageSource, prepared, tsv: str) -> dict:
+    layout = parse_tsv(tsv)
+    if prepared is source:
+        return layout
+    # As caixas voltam para as coordenadas da imagem original (o pré-processamento redimensiona)
+    if isinstance(source, Image.Image):
+        width, height = source.size
+    elif isinstance(source, (str, os.PathLike)):
+        with Image.open(source) as img:
+            width, height = img.size
+    else:
+        with Image.open(io.BytesIO(source)) as img:
+            width, height = img.size
+    return scale_layout(layout, width / prepared.size[0], height / prepared.size[1])
+
+
+def ocr_source_layout(source: ImageSource, lang: str = 'por', engine=None) -> dict:
+    """
+    Como `ocr_source`, mas retorna o resultado estruturado (ver `ocr_layout`),
+    a partir da mesma e única execução do reconhecimento.
+    """
+    with stage('preprocess'):
+        prepared = prepare_for_ocr(source)
+    if prepared is None:
+        return empty_layout()
+    with stage('recognize'):
+        tsv = (engine or get_engine()).recognize_tsv(prepared, lang=lang)
+    return _layout_from_tsv(source, prepared, tsv)
+
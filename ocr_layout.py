@@ -0,0 +1,133 @@
+"""
+Resultado estruturado do OCR a partir de uma única execução do Tesseract.
+
+Em vez de rodar `image_to_string` e depois `image_to_data` sobre a mesma
+imagem, o motor gera a saída TSV uma vez e daqui saem o texto, as palavras com
+caixa e confiança e a estrutura de parágrafos e linhas:
+
+    {
+      "text": "...",
+      "confidence": 0.91,          # média das palavras, ponderada pelo tamanho, de 0 a 1
+      "paragraphs": [
+        {"box": [x, y, w, h], "lines": [
+          {"text": "...", "box": [x, y, w, h], "confidence": 0.93,
+           "words": [["palavra", [x, y, w, h], 0.95], ...]}
+        ]}
+      ]
+    }
+
+As palavras são listas (texto, caixa, confiança) para manter a resposta compacta.
+As caixas ficam nas coordenadas da imagem original (ver `scale_layout`).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# Colunas da saída TSV do Tesseract
+TSV_COLUMNS = 12
+WORD_LEVEL = '5'
+
+
+def empty_layout() -> dict:
+    return {"text": "", "confidence": None, "paragraphs": []}
+
+
+def _union(boxes: List[List[int]]) -> List[int]:
+    left = min(box[0] for box in boxes)
+    top = min(box[1] for box in boxes)
+    right = max(box[0] + box[2] for box in boxes)
+    bottom = max(box[1] + box[3] for box in boxes)
+    return [left, top, right - left, bottom - top]
+
+
+def _weighted_confidence(words) -> Optional[float]:
+    # Ponderada pelo número de caracteres: uma palavra longa pesa mais que uma vírgula solta
+    total = sum(len(word[0]) for word in words)
+    if not total:
+        return None
+    return round(sum(word[2] * len(word[0]) for word in words) / total, 4)
+
+
+def _finish(paragraphs: List[dict]) -> dict:
+    lines = [line for paragraph in paragraphs for line in paragraph['lines']]
+    words = [word for line in lines for word in line['words']]
+    text = '\n\n'.join('\n'.join(line['text'] for line in paragraph['lines']) for paragraph in paragraphs)
+    return {"text": text, "confidence": _weighted_confidence(words), "paragraphs": paragraphs}
+
+
+def parse_tsv(tsv: str) -> dict:
+    """
+    Monta o resultado estruturado a partir da saída TSV do Tesseract.
+    Linhas e parágrafos sem nenhuma palavra reconhecida são descartados.
+    """
+    paragraphs: List[dict] = []
+    paragraph_index: Dict[Tuple[str, str, str], dict] = {}
+    line_index: Dict[Tuple[str, str, str, str], dict] = {}
+
+    for row in tsv.splitlines()[1:]:
+        fields = row.split('\t', TSV_COLUMNS - 1)
+        if len(fields) < TSV_COLUMNS or fields[0] != WORD_LEVEL:
+            continue
+        text = fields[11].strip()
+        try:
+            confidence = float(fields[10])
+        except ValueError:
+            continue
+        if not text or confidence < 0:
+            continue
+
+        page, block, par, line = fields[1:5]
+        box = [int(fields[6]), int(fields[7]), int(fields[8]), int(fields[9])]
+        word = [text, box, round(confidence / 100, 4)]
+
+        line_key = (page, block, par, line)
+        line_entry = line_index.get(line_key)
+        if line_entry is None:
+            paragraph_key = (page, block, par)
+            paragraph = paragraph_index.get(paragraph_key)
+            if paragraph is None:
+                paragraph = paragraph_index[paragraph_key] = {"box": None, "lines": []}
+                paragraphs.append(paragraph)
+            line_entry = line_index[line_key] = {"text": "", "box": None, "confidence": None, "words": []}
+            paragraph['lines'].append(line_entry)
+        line_entry['words'].append(word)
+
+    for paragraph in paragraphs:
+        for line in paragraph['lines']:
+            line['text'] = ' '.join(word[0] for word in line['words'])
+            line['box'] = _union([word[1] for word in line['words']])
+            line['confidence'] = _weighted_confidence(line['words'])
+        paragraph['box'] = _union([line['box'] for line in paragraph['lines']])
+    return _finish(paragraphs)
+
+
+def scale_layout(layout: dict, factor_x: float = 1.0, factor_y: float = 1.0,
+                 offset_x: int = 0, offset_y: int = 0) -> dict:
+    """
+    Leva as caixas para outro sistema de coordenadas: x' = (x + offset_x) * factor_x.
+    Usado para desfazer o redimensionamento do pré-processamento e posicionar tiras
+    de imagens altas dentro da imagem inteira. Altera e retorna o próprio `layout`.
+    """
+    if factor_x == 1.0 and factor_y == 1.0 and not offset_x and not offset_y:
+        return layout
+
+    def convert(box):
+        left = round((box[0] + offset_x) * factor_x)
+        top = round((box[1] + offset_y) * factor_y)
+        box[2] = round((box[0] + offset_x + box[2]) * factor_x) - left
+        box[3] = round((box[1] + offset_y + box[3]) * factor_y) - top
+        box[0], box[1] = left, top
+
+    for paragraph in layout['paragraphs']:
+        convert(paragraph['box'])
+        for line in paragraph['lines']:
+            convert(line['box'])
+            for word in line['words']:
+                convert(word[1])
+    return layout
+
+
+def merge_layouts(layouts: List[dict]) -> dict:
+    """
+    Junta, em ordem, os resultados das tiras de uma mesma imagem (já em coordenadas da imagem inteira).
+    """
+    return _finish([paragraph for layout in layouts for paragraph in layout['paragraphs']])
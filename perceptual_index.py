@@ -0,0 +1,309 @@
+"""
+Índice de hashes perceptuais das imagens já reconhecidas, para reaproveitar o
+texto de slides repostados, recomprimidos ou redimensionados, que o hash exato
+dos bytes (ver `ocr_cache`) nunca reconhece.
+
+Cada imagem recebe três hashes e uma miniatura, calculados em tons de cinza:
+
+- pHash de 64 bits (frequências baixas da DCT): chave da busca por vizinhos
+  (`HammingIndex`), com raio `PHASH_INDEX_RADIUS`. É estável sob compressão e escala, mas grosso
+  demais para separar slides diferentes feitos sobre o mesmo modelo visual;
+- pHash de 256 bits e dHash de 256 bits (gradientes horizontais): descartam os
+  candidatos com distâncias de Hamming acima de `PHASH_MAX_DISTANCE` e `DHASH_MAX_DISTANCE`;
+- miniatura de `THUMB_WIDTH` pixels de largura (4 bits por pixel): confirma o
+  candidato pixel a pixel (`pixels_match`). Os hashes não distinguem slides do
+  mesmo modelo que mudam só uma palavra ou um número ("Passo 1 de 5" e
+  "Passo 2 de 5" ficam a 0-2 bits), a miniatura sim.
+
+Há um índice por idioma/configuração do OCR. O índice guarda a chave do texto
+no `OCRCache` e é persistido no mesmo banco SQLite; as miniaturas ficam só no
+banco (são lidas apenas para os candidatos) ou, sem banco, em memória.
+"""
+
+import io
+import os
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from ocr_cache import DEFAULT_DB_PATH
+
+OCR_PHASH = os.getenv("OCR_PHASH", "1") not in ("0", "false", "no")
+PHASH_INDEX_RADIUS = int(os.getenv("PHASH_INDEX_RADIUS", 6))
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", 10))
+DHASH_MAX_DISTANCE = int(os.getenv("DHASH_MAX_DISTANCE", 6))
+# Diferença média máxima (0-255) em cada bloco de 2x2 pixels da miniatura
+PHASH_PIXEL_DIFF = int(os.getenv("PHASH_PIXEL_DIFF", 56))
+
+# Lados dos hashes (lado² bits) e das miniaturas sobre as quais as DCTs são calculadas
+INDEX_HASH_SIZE = 8
+INDEX_DCT_SIZE = 32
+HASH_SIZE = 16
+DCT_SIZE = 64
+THUMB_WIDTH = 320
+
+RESAMPLE = Image.Resampling.BOX if hasattr(Image, 'Resampling') else Image.BOX
+
+# (pHash de 64 bits, pHash de 256 bits, dHash de 256 bits, miniatura compactada)
+ImageHashes = Tuple[int, int, int, bytes]
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = {n: _dct_matrix(n) for n in (INDEX_DCT_SIZE, DCT_SIZE)}
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def _open_gray(source: Union[bytes, str, os.PathLike, Image.Image]) -> Image.Image:
+    if isinstance(source, Image.Image):
+        img = source
+    elif isinstance(source, (str, os.PathLike)):
+        img = Image.open(source)
+    else:
+        img = Image.open(io.BytesIO(source))
+    # Só tem efeito em JPEG: decodifica já reduzido, com folga sobre a miniatura (a redução
+    # da DCT em 1/2, 1/4... direto para perto de THUMB_WIDTH distorce a comparação de pixels)
+    img.draft('L', (THUMB_WIDTH * 2, THUMB_WIDTH * 2))
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img.convert('RGBA'))
+    return img.convert('L')
+
+
+def _phash(gray: Image.Image, dct_size: int, hash_size: int) -> int:
+    small = np.asarray(gray.resize((dct_size, dct_size), RESAMPLE), dtype=np.float64)
+    dct = _DCT[dct_size]
+    coefficients = (dct @ small @ dct.T)[:hash_size, :hash_size]
+    # O termo DC (brilho médio) fica fora da mediana
+    median = np.median(coefficients.ravel()[1:])
+    return _bits_to_int(coefficients > median)
+
+
+def _thumbnail(gray: Image.Image) -> bytes:
+    # Largura fixa, altura proporcional; 4 bits por pixel, dois pixels por byte
+    height = max(1, round(THUMB_WIDTH * gray.height / gray.width))
+    pixels = np.asarray(gray.resize((THUMB_WIDTH, height), RESAMPLE), dtype=np.uint8) >> 4
+    return zlib.compress(((pixels[:, ::2] << 4) | pixels[:, 1::2]).tobytes())
+
+
+def _unpack_thumbnail(data: bytes) -> np.ndarray:
+    packed = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(-1, THUMB_WIDTH // 2)
+    pixels = np.empty((packed.shape[0], THUMB_WIDTH), dtype=np.int32)
+    pixels[:, ::2] = packed >> 4
+    pixels[:, 1::2] = packed & 0x0F
+    return pixels * 16
+
+
+def pixels_match(a: bytes, b: bytes, max_diff: int = PHASH_PIXEL_DIFF) -> bool:
+    """
+    Compara duas miniaturas (ver `image_hashes`): iguais se nenhum bloco de 2x2
+    pixels diferir, em média, mais que `max_diff`. Somar a diferença com sinal no
+    bloco anula o ruído de compressão nas bordas das letras, que alterna de sinal,
+    mas não uma letra ou um dígito trocado.
+    """
+    pa, pb = _unpack_thumbnail(a), _unpack_thumbnail(b)
+    # Proporções diferentes não são a mesma imagem; uma linha de diferença é arredondamento
+    if abs(len(pa) - len(pb)) > 1:
+        return False
+    rows = min(len(pa), len(pb))
+    diff = pa[:rows] - pb[:rows]
+    blocks = diff[:-1, :-1] + diff[1:, :-1] + diff[:-1, 1:] + diff[1:, 1:]
+    return not (np.abs(blocks) > 4 * max_diff).any()
+
+
+def image_hashes(source: Union[bytes, str, os.PathLike, Image.Image]) -> ImageHashes:
+    """
+    Calcula (pHash de 64 bits, pHash de 256 bits, dHash de 256 bits, miniatura) da imagem.
+    """
+    gray = _open_gray(source)
+    grid = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), RESAMPLE), dtype=np.int16)
+    return (
+        _phash(gray, INDEX_DCT_SIZE, INDEX_HASH_SIZE),
+        _phash(gray, DCT_SIZE, HASH_SIZE),
+        _bits_to_int(grid[:, 1:] > grid[:, :-1]),
+        _thumbnail(gray),
+    )
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class HammingIndex:
+    """
+    Busca por raio de Hamming sobre hashes de 64 bits, guardados em um vetor
+    NumPy contíguo: cada consulta é um XOR + popcount vetorizado sobre todas as
+    entradas (~0,2 ms para 100 mil). Uma BK-tree degenera em varredura quase
+    completa, nó a nó em Python, com hashes de 64 bits e raios úteis (~10 bits).
+    """
+
+    __slots__ = ('_hashes', '_values', '_size')
+
+    def __init__(self, capacity: int = 1024):
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self._values = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value_hash: int, value):
+        if self._size == len(self._hashes):
+            self._hashes = np.concatenate((self._hashes, np.zeros(len(self._hashes), dtype=np.uint64)))
+        self._hashes[self._size] = value_hash
+        self._values.append(value)
+        self._size += 1
+
+    def search(self, value_hash: int, radius: int) -> List[Tuple[int, object]]:
+        """
+        Retorna os pares (distância, valor) a até `radius` de `value_hash`, do mais próximo ao mais distante.
+        """
+        if self._size == 0:
+            return []
+        distances = _popcount(self._hashes[:self._size] ^ np.uint64(value_hash))
+        matches = np.flatnonzero(distances <= radius)
+        matches = matches[np.argsort(distances[matches], kind='stable')]
+        return [(int(distances[i]), self._values[i]) for i in matches]
+
+
+class PerceptualIndex:
+    """
+    Índice persistente (hashes perceptuais -> chave do texto no `OCRCache`).
+
+    `namespace` separa idiomas e configurações do OCR, como a chave do cache.
+    Seguro para uso a partir de várias threads.
+    """
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_DB_PATH, radius: int = PHASH_INDEX_RADIUS,
+                 max_distance: int = PHASH_MAX_DISTANCE, max_dhash_distance: int = DHASH_MAX_DISTANCE,
+                 max_pixel_diff: int = PHASH_PIXEL_DIFF):
+        self.radius = radius
+        self.max_distance = max_distance
+        self.max_dhash_distance = max_dhash_distance
+        self.max_pixel_diff = max_pixel_diff
+        self._trees: Dict[str, HammingIndex] = {}
+        self._keys = set()
+        # Miniaturas por chave, só quando não há banco
+        self._thumbnails: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS phash_index (key TEXT PRIMARY KEY, namespace TEXT NOT NULL, "
+                "index_hash TEXT NOT NULL, phash TEXT NOT NULL, dhash TEXT NOT NULL, thumbnail BLOB)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(phash_index)")}
+            if 'thumbnail' not in columns:
+                # Bancos anteriores à confirmação por miniatura: essas entradas são ignoradas
+                self._db.execute("ALTER TABLE phash_index ADD COLUMN thumbnail BLOB")
+            self._db.commit()
+
+    def _tree(self, namespace: str) -> HammingIndex:
+        # Chamado com self._lock adquirido; carrega o namespace do disco no primeiro uso
+        tree = self._trees.get(namespace)
+        if tree is None:
+            tree = self._trees[namespace] = HammingIndex()
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT key, index_hash, phash, dhash FROM phash_index "
+                    "WHERE namespace = ? AND thumbnail IS NOT NULL", (namespace,)
+                )
+                for key, index_hash, phash, dhash in rows:
+                    tree.add(int(index_hash, 16), (int(phash, 16), int(dhash, 16), key))
+                    self._keys.add(key)
+        return tree
+
+    def _thumbnail(self, key: str) -> Optional[bytes]:
+        # Chamado com self._lock adquirido
+        if self._db is None:
+            return self._thumbnails.get(key)
+        row = self._db.execute("SELECT thumbnail FROM phash_index WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, hashes: ImageHashes, namespace: str) -> Optional[str]:
+        """
+        Retorna a chave do cache da imagem indexada mais parecida, ou None se nenhuma estiver perto o bastante.
+        """
+        index_hash, phash, dhash, thumbnail = hashes
+        with self._lock:
+            candidates = []
+            for _, (candidate_phash, candidate_dhash, key) in self._tree(namespace).search(index_hash, self.radius):
+                distance = hamming(phash, candidate_phash)
+                if distance <= self.max_distance and hamming(dhash, candidate_dhash) <= self.max_dhash_distance:
+                    candidates.append((distance, key))
+            # Do mais ao menos parecido; a miniatura decide
+            for _, key in sorted(candidates):
+                candidate_thumbnail = self._thumbnail(key)
+                if candidate_thumbnail is not None and pixels_match(thumbnail, candidate_thumbnail, self.max_pixel_diff):
+                    self.hits += 1
+                    return key
+            self.misses += 1
+        return None
+
+    def add(self, hashes: ImageHashes, namespace: str, key: str):
+        index_hash, phash, dhash, thumbnail = hashes
+        with self._lock:
+            tree = self._tree(namespace)
+            if key in self._keys:
+                return
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO phash_index (key, namespace, index_hash, phash, dhash, thumbnail) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, namespace, format(index_hash, 'x'), format(phash, 'x'), format(dhash, 'x'), thumbnail)
+                )
+                self._db.commit()
+            else:
+                self._thumbnails[key] = thumbnail
+            tree.add(index_hash, (phash, dhash, key))
+            self._keys.add(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": sum(len(tree) for tree in self._trees.values()),
+                "radius": self.radius,
+                "max_distance": self.max_distance,
+                "max_dhash_distance": self.max_dhash_distance,
+                "max_pixel_diff": self.max_pixel_diff,
+            }
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
@@ -0,0 +1,188 @@
+"""
+Pré-processamento das imagens antes do OCR, vetorizado com NumPy.
+
+Etapas, todas configuráveis por variáveis de ambiente:
+
+1. Conversão para tons de cinza (com fundo branco para imagens transparentes);
+2. Detecção barata de slides vazios ou de cor sólida, que pulam o OCR;
+3. Normalização da resolução para que as linhas de texto tenham cerca de
+   `OCR_TARGET_TEXT_HEIGHT` pixels (estimadas pelo perfil de projeção das linhas);
+4. Binarização por limiar adaptativo (média local via imagem integral).
+
+Com `OCR_PREPROCESS=0` a etapa é desligada e a imagem original segue direto
+para o motor de OCR.
+"""
+
+import io
+import os
+from typing import Optional, Union
+
+import numpy as np
+from PIL import Image
+
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") not in ("0", "false", "no")
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", 32))
+OCR_MIN_SCALE = float(os.getenv("OCR_MIN_SCALE", 0.25))
+OCR_MAX_SCALE = float(os.getenv("OCR_MAX_SCALE", 2.0))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 4000))
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "1") not in ("0", "false", "no")
+OCR_BLANK_STD = float(os.getenv("OCR_BLANK_STD", 6.0))
+OCR_BLANK_INK_RATIO = float(os.getenv("OCR_BLANK_INK_RATIO", 0.0005))
+# Altura mínima, em pixels, de uma faixa de tinta para o slide não ser considerado vazio
+OCR_BLANK_MIN_TEXT_HEIGHT = int(os.getenv("OCR_BLANK_MIN_TEXT_HEIGHT", 6))
+
+# Diferença mínima em relação ao fundo para um pixel ser considerado "tinta"
+INK_DELTA = 48
+
+RESAMPLE = Image.Resampling.BILINEAR if hasattr(Image, 'Resampling') else Image.BILINEAR
+
+
+def signature() -> str:
+    """
+    Descreve a configuração atual do pré-processamento, para compor as chaves do cache.
+    """
+    if not OCR_PREPROCESS:
+        return ''
+    return (f"pp:h{OCR_TARGET_TEXT_HEIGHT}:s{OCR_MIN_SCALE}-{OCR_MAX_SCALE}:m{OCR_MAX_SIDE}"
+            f":b{int(OCR_BINARIZE)}:z{OCR_BLANK_STD}-{OCR_BLANK_INK_RATIO}-{OCR_BLANK_MIN_TEXT_HEIGHT}")
+
+
+def load_gray(source: Union[bytes, str, os.PathLike, Image.Image]) -> Image.Image:
+    """
+    Abre a imagem em tons de cinza. JPEGs grandes são decodificados já reduzidos (modo draft).
+    """
+    if isinstance(source, Image.Image):
+        img = source
+    elif isinstance(source, (str, os.PathLike)):
+        img = Image.open(source)
+    else:
+        img = Image.open(io.BytesIO(source))
+
+    if img.format == 'JPEG' and max(img.size) > OCR_MAX_SIDE:
+        img.draft('L', (OCR_MAX_SIDE, OCR_MAX_SIDE))
+
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        # Áreas transparentes viram branco em vez de preto
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img.convert('RGBA'))
+    return img.convert('L')
+
+
+def ink_mask(gray: np.ndarray) -> np.ndarray:
+    """
+    Marca os pixels que diferem do fundo (a mediana da imagem) o bastante para serem "tinta".
+    """
+    background = int(np.median(gray[::4, ::4]))
+    return np.abs(gray.astype(np.int16) - background) > INK_DELTA
+
+
+def text_row_bands(ink: np.ndarray, min_ratio: float = 0.002) -> np.ndarray:
+    """
+    Perfil de projeção horizontal: retorna os intervalos [início, fim) de linhas
+    de pixels consecutivas que contêm tinta, como uma matriz (n, 2).
+    """
+    rows = ink.mean(axis=1) > min_ratio
+    edges = np.diff(np.concatenate(([0], rows.astype(np.int8), [0])))
+    return np.stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)), axis=1)
+
+
+def is_blank(gray: np.ndarray) -> bool:
+    """
+    Detecta slides vazios ou de cor sólida. Uma amostra esparsa dos pixels descarta
+    rápido os slides com texto; quando ela tem pouca tinta, a decisão vem da imagem
+    inteira: o slide só é vazio se nenhuma faixa de linhas com tinta tiver pelo
+    menos `OCR_BLANK_MIN_TEXT_HEIGHT` pixels. Uma legenda curta ("Fim.", "1/5",
+    "Arraste →") ocupa menos de 0,05% de um slide e não pode sumir por proporção.
+    """
+    step = max(1, max(gray.shape) // 256)
+    sample = gray[::step, ::step]
+    if sample.std() >= OCR_BLANK_STD:
+        background = np.median(sample)
+        ink = np.abs(sample.astype(np.int16) - int(background)) > INK_DELTA
+        if ink.mean() >= OCR_BLANK_INK_RATIO:
+            return False
+
+    # Linhas com ao menos dois pixels de tinta; pontos isolados de ruído não formam faixas
+    bands = text_row_bands(ink_mask(gray), min_ratio=1.5 / gray.shape[1])
+    return not ((bands[:, 1] - bands[:, 0]) >= OCR_BLANK_MIN_TEXT_HEIGHT).any()
+
+
+def estimate_text_height(gray: np.ndarray) -> Optional[float]:
+    """
+    Estima a altura típica das linhas de texto pelo perfil de projeção horizontal:
+    a mediana das sequências de linhas de pixels que contêm "tinta".
+    """
+    bands = text_row_bands(ink_mask(gray))
+    heights = bands[:, 1] - bands[:, 0]
+    heights = heights[heights >= 4]
+    if heights.size == 0:
+        return None
+    return float(np.median(heights))
+
+
+def adaptive_threshold(gray: np.ndarray, window: int, offset: int = 10) -> np.ndarray:
+    """
+    Binariza comparando cada pixel com a média da sua vizinhança (janela quadrada),
+    calculada em O(1) por pixel com uma imagem integral.
+    """
+    h, w = gray.shape
+    values = gray.astype(np.float64)
+    integral = np.zeros((h + 1, w + 1), dtype=np.float64)
+    integral[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+
+    r = window // 2
+    y0 = np.clip(np.arange(h) - r, 0, h)
+    y1 = np.clip(np.arange(h) + r + 1, 0, h)
+    x0 = np.clip(np.arange(w) - r, 0, w)
+    x1 = np.clip(np.arange(w) + r + 1, 0, w)
+
+    sums = (integral[y1][:, x1] - integral[y0][:, x1]
+            - integral[y1][:, x0] + integral[y0][:, x0])
+    counts = (y1 - y0)[:, None] * (x1 - x0)[None, :]
+    mean = sums / counts
+    return np.where(values > mean - offset, 255, 0).astype(np.uint8)
+
+
+def preprocess(source: Union[bytes, str, os.PathLike, Image.Image]) -> Optional[Image.Image]:
+    """
+    Aplica o pré-processamento completo. Retorna None se a imagem estiver vazia
+    (não há texto a extrair) ou a imagem em tons de cinza/binarizada pronta para o OCR.
+    """
+    img = load_gray(source)
+    gray = np.asarray(img)
+    if is_blank(gray):
+        return None
+
+    # Texto claro sobre fundo escuro é invertido, para o limiar adaptativo e o Tesseract
+    if np.median(gray[::4, ::4]) < 128:
+        gray = 255 - gray
+
+    text_height = estimate_text_height(gray)
+    scale = 1.0
+    if text_height:
+        scale = min(max(OCR_TARGET_TEXT_HEIGHT / text_height, OCR_MIN_SCALE), OCR_MAX_SCALE)
+    scale = min(scale, OCR_MAX_SIDE / max(gray.shape))
+    if abs(scale - 1.0) > 0.05:
+        size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+        gray = np.asarray(Image.fromarray(gray).resize(size, RESAMPLE))
+        if text_height:
+            text_height *= scale
+
+    if OCR_BINARIZE:
+        window = max(15, int((text_height or OCR_TARGET_TEXT_HEIGHT) * 2) | 1)
+        gray = adaptive_threshold(gray, window)
+
+    return Image.fromarray(gray)
+
+
+def prepare_for_ocr(source: Union[bytes, str, os.PathLike]):
+    """
+    Ponto de entrada usado pela API e pela aplicação desktop.
+
+    Com o pré-processamento desligado, devolve a própria fonte (que segue direto
+    para o motor). Caso contrário, devolve a imagem pré-processada, ou None
+    quando o slide está vazio e o OCR deve ser pulado.
+    """
+    if not OCR_PREPROCESS:
+        return source
+    return preprocess(source)
@@ -0,0 +1,108 @@
+"""
+Cache das miniaturas exibidas na pré-visualização da aplicação desktop.
+
+As miniaturas já decodificadas (PIL) ficam em um LRU limitado, com chave
+(caminho, largura, altura) do canvas. JPEGs são decodificados em modo draft,
+já reduzidos pelo próprio decodificador (1/2, 1/4 ou 1/8), o que evita
+decodificar fotos de dezenas de megapixels só para exibi-las em ~500 px.
+As imagens vizinhas podem ser carregadas em segundo plano (`prefetch`), para
+que a navegação com ◀/▶ seja praticamente instantânea.
+
+Os objetos `ImageTk.PhotoImage` continuam sendo criados na thread do Tk.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Tuple
+
+from PIL import Image
+
+PREVIEW_CACHE_SIZE = int(os.getenv("PREVIEW_CACHE_SIZE", 32))
+
+RESAMPLE = Image.Resampling.LANCZOS if hasattr(Image, 'Resampling') else Image.ANTIALIAS
+
+
+def load_thumbnail(path: str, size: Tuple[int, int]) -> Image.Image:
+    """
+    Decodifica a imagem já reduzida para caber em `size`, mantendo a proporção.
+    """
+    img = Image.open(path)
+    # Só tem efeito em JPEG: o decodificador entrega a menor escala que ainda cobre `size`
+    img.draft(img.mode, size)
+    img.thumbnail(size, RESAMPLE)
+    img.load()
+    return img
+
+
+class PreviewCache:
+    """
+    LRU de miniaturas decodificadas, com carregamento antecipado em segundo plano.
+    """
+
+    def __init__(self, max_items: int = PREVIEW_CACHE_SIZE, prefetch_workers: int = 2):
+        self.max_items = max(1, max_items)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='preview')
+
+    def _lookup(self, key):
+        # Chamado com self._lock adquirido
+        entry = self._items.get(key)
+        if entry is not None:
+            self._items.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        # Chamado com self._lock adquirido
+        self._items[key] = entry
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def _load(self, key, future: Future):
+        path, width, height = key
+        try:
+            future.set_result(load_thumbnail(path, (width, height)))
+        except Exception as e:
+            future.set_exception(e)
+            with self._lock:
+                # Erros não ficam no cache: uma nova tentativa relê o arquivo
+                if self._items.get(key) is future:
+                    del self._items[key]
+
+    def _entry(self, path: str, size: Tuple[int, int], background: bool) -> Future:
+        key = (path, size[0], size[1])
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            entry = Future()
+            self._store(key, entry)
+        if background:
+            self._executor.submit(self._load, key, entry)
+        else:
+            self._load(key, entry)
+        return entry
+
+    def get(self, path: str, size: Tuple[int, int]) -> Image.Image:
+        """
+        Retorna a miniatura, decodificando-a agora se ainda não estiver no cache
+        (ou aguardando o carregamento antecipado que já esteja em andamento).
+        """
+        return self._entry(path, size, background=False).result()
+
+    def prefetch(self, paths: Iterable[str], size: Tuple[int, int]):
+        """
+        Agenda o carregamento das miniaturas em segundo plano, sem bloquear.
+        """
+        for path in paths:
+            self._entry(path, size, background=True)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,335 @@
+"""
+Clientes do Instagram e do TikTok reaproveitados entre posts, e ingestão em lote
+de listas de URLs.
+
+- Um cliente por plataforma e por processo (`get_client`): o Instaloader mantém
+  sua sessão HTTP e o TikTokApi mantém suas sessões e o event loop em uma
+  thread própria, em vez de tudo ser recriado a cada link;
+- `ingest_urls` processa centenas de URLs com no máximo `INGEST_CONCURRENCY`
+  posts em andamento e um token bucket por plataforma (`INGEST_RATE` consultas
+  por segundo, com rajadas de até `INGEST_BURST`);
+- Os posts concluídos são gravados em um arquivo de checkpoint (um por linha),
+  de modo que uma execução interrompida continua de onde parou.
+
+Apenas a consulta às plataformas (metadados do post) passa pelo limite de taxa;
+o download das imagens em si fica com o `downloader`.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 2))
+INGEST_RATE = float(os.getenv("INGEST_RATE", 0.5))
+INGEST_BURST = int(os.getenv("INGEST_BURST", 3))
+TIKTOK_TIMEOUT = float(os.getenv("TIKTOK_TIMEOUT", 60))
+TIKTOK_MS_TOKEN = os.getenv("TIKTOK_MS_TOKEN")
+
+
+class UnsupportedURLError(ValueError):
+    pass
+
+
+class MediaPost:
+    """
+    Um post resolvido: plataforma, identificador, legenda e URLs das imagens, na
+    ordem do carrossel. Posts de vídeo não têm imagens e trazem `video_url`.
+    """
+
+    __slots__ = ('platform', 'post_id', 'caption', 'image_urls', 'video_url')
+
+    def __init__(self, platform: str, post_id: str, caption: str, image_urls: List[str],
+                 video_url: Optional[str] = None):
+        self.platform = platform
+        self.post_id = post_id
+        self.caption = caption
+        self.image_urls = image_urls
+        self.video_url = video_url
+
+    @property
+    def key(self) -> str:
+        return f"{self.platform}:{self.post_id}"
+
+    def caption_text(self) -> str:
+        """
+        Legenda formatada como a aplicação desktop a exibe antes do texto da primeira imagem.
+        """
+        if not self.caption:
+            return ""
+        label = "Instagram" if self.platform == 'instagram' else "TikTok"
+        return f"Legenda do {label}:\n{'-'*20}\n{self.caption}\n{'-'*20}\n\n"
+
+    def __repr__(self):
+        return f"MediaPost({self.key!r}, images={len(self.image_urls)})"
+
+
+def parse_post_url(url: str) -> Tuple[str, str]:
+    """
+    Identifica a plataforma e o identificador do post (shortcode do Instagram,
+    id do TikTok) sem acessar a rede.
+    """
+    parsed = urlparse(url.strip())
+    domain = parsed.netloc.lower()
+    segments = [s for s in parsed.path.split('/') if s]
+    if not segments:
+        raise UnsupportedURLError(f"URL sem identificador de post: {url}")
+    if "instagram.com" in domain:
+        return 'instagram', segments[-1]
+    if "tiktok.com" in domain:
+        return 'tiktok', segments[-1]
+    raise UnsupportedURLError(f"URL não suportada (use links do TikTok ou Instagram): {url}")
+
+
+def post_key(url: str) -> str:
+    platform, post_id = parse_post_url(url)
+    return f"{platform}:{post_id}"
+
+
+class TokenBucket:
+    """
+    Limite de taxa thread-safe: até `capacity` consultas em rajada e, depois,
+    `rate` consultas por segundo.
+    """
+
+    def __init__(self, rate: float = INGEST_RATE, capacity: int = INGEST_BURST):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        Bloqueia até haver uma ficha disponível. Retorna False se `cancel_event` for acionado antes.
+        """
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+
+
+class InstagramClient:
+    platform = 'instagram'
+
+    def __init__(self):
+        import instaloader
+
+        self._instaloader = instaloader
+        self._loader = instaloader.Instaloader(
+            download_videos=False, save_metadata=False, post_metadata_txt_pattern='', quiet=True
+        )
+        # O contexto do Instaloader guarda estado da sessão e não é thread-safe
+        self._lock = threading.Lock()
+
+    def fetch_post(self, url: str) -> MediaPost:
+        _, shortcode = parse_post_url(url)
+        with self._lock:
+            post = self._instaloader.Post.from_shortcode(self._loader.context, shortcode)
+            video_url = None
+            if post.typename == 'GraphSidecar':
+                nodes = list(post.get_sidecar_nodes())
+                image_urls = [node.display_url for node in nodes if not node.is_video]
+                if not image_urls:
+                    video_url = next((node.video_url for node in nodes if node.is_video), None)
+            elif post.is_video:
+                image_urls = []
+                video_url = post.video_url
+            else:
+                image_urls = [post.url]
+            caption = post.caption or ''
+        if not image_urls and not video_url:
+            raise ValueError("Nenhuma imagem ou vídeo encontrado no post.")
+        return MediaPost(self.platform, shortcode, caption, image_urls, video_url)
+
+    def close(self):
+        self._loader.close()
+
+
+class TikTokClient:
+    """
+    O TikTokApi é assíncrono: o cliente mantém um event loop em uma thread
+    própria, onde a API e suas sessões vivem durante todo o processo.
+    """
+
+    platform = 'tiktok'
+
+    def __init__(self):
+        from TikTokApi import TikTokApi
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='tiktok-client', daemon=True)
+        self._thread.start()
+        self._api = TikTokApi()
+        if hasattr(self._api, 'create_sessions'):
+            ms_tokens = [TIKTOK_MS_TOKEN] if TIKTOK_MS_TOKEN else None
+            self._run(self._api.create_sessions(num_sessions=1, ms_tokens=ms_tokens, sleep_after=3))
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(TIKTOK_TIMEOUT)
+
+    def fetch_post(self, url: str) -> MediaPost:
+        _, post_id = parse_post_url(url)
+
+        async def info():
+            return await self._api.video(url=url).info()
+
+        video_info = self._run(info())
+        caption = video_info.get('desc', '')
+        if 'image_post' not in video_info:
+            video = video_info.get('video') or {}
+            video_url = video.get('playAddr') or video.get('downloadAddr')
+            if not video_url:
+                raise ValueError("O link não parece ser um carrossel ou vídeo, ou os dados não foram retornados.")
+            return MediaPost(self.platform, post_id, caption, [], video_url)
+
+        images = video_info['image_post'].get('images', [])
+        image_urls = [image.get('image_url', {}).get('url_list', [None])[-1] for image in images]
+        image_urls = [image_url for image_url in image_urls if image_url]
+        if not image_urls:
+            raise ValueError("Nenhuma imagem encontrada no post do carrossel.")
+        return MediaPost(self.platform, post_id, caption, image_urls)
+
+    def close(self):
+        if hasattr(self._api, 'close_sessions'):
+            try:
+                self._run(self._api.close_sessions())
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+CLIENTS = {
+    'instagram': InstagramClient,
+    'tiktok': TikTokClient,
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(platform: str):
+    """
+    Retorna o cliente da plataforma (instância única por processo, criada no primeiro uso).
+    """
+    with _clients_lock:
+        if platform not in _clients:
+            if platform not in CLIENTS:
+                raise UnsupportedURLError(f"Plataforma não suportada: {platform}")
+            _clients[platform] = CLIENTS[platform]()
+        return _clients[platform]
+
+
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def fetch_post(url: str) -> MediaPost:
+    platform, _ = parse_post_url(url)
+    return get_client(platform).fetch_post(url)
+
+
+def read_url_list(path) -> List[str]:
+    """
+    Lê um arquivo com uma URL por linha, ignorando linhas vazias e comentários (#).
+    """
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class Checkpoint:
+    """
+    Posts já concluídos (`plataforma:id`), gravados um por linha à medida que terminam.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                self._done.update(line.strip() for line in f if line.strip())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._done
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def mark(self, key: str):
+        with self._lock:
+            if key in self._done:
+                return
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(key + '\n')
+            self._done.add(key)
+
+
+def ingest_urls(urls: Sequence[str], handle_post: Callable[[MediaPost], object],
+                concurrency: int = INGEST_CONCURRENCY, rate: float = INGEST_RATE, burst: int = INGEST_BURST,
+                checkpoint: Optional[Checkpoint] = None,
+                cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[str, object]]:
+    """
+    Resolve cada URL no cliente da sua plataforma e chama `handle_post(post)`
+    (ex.: download + OCR), com até `concurrency` posts em andamento.
+
+    Gera pares (url, retorno de `handle_post` ou exceção) à medida que os posts
+    terminam. URLs repetidas ou já presentes no checkpoint são puladas; os posts
+    concluídos sem erro são gravados no checkpoint.
+    """
+    buckets = {platform: TokenBucket(rate, burst) for platform in CLIENTS}
+
+    def process(url):
+        platform, _ = parse_post_url(url)
+        if not buckets[platform].acquire(cancel_event):
+            raise InterruptedError("Ingestão cancelada.")
+        result = handle_post(fetch_post(url))
+        if checkpoint is not None:
+            checkpoint.mark(post_key(url))
+        return result
+
+    pending_urls = []
+    seen = set()
+    for url in urls:
+        try:
+            key = post_key(url)
+        except UnsupportedURLError as e:
+            yield url, e
+            continue
+        if key in seen or (checkpoint is not None and key in checkpoint):
+            continue
+        seen.add(key)
+        pending_urls.append(url)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='ingest') as executor:
+        futures = {executor.submit(process, url): url for url in pending_urls}
+        try:
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                yield futures[future], result
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+        finally:
+            for pending in futures:
+                pending.cancel()
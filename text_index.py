@@ -0,0 +1,234 @@
+"""
+Índice de texto completo (SQLite FTS5) de tudo que já passou pelo OCR.
+
+Cada resultado vira um documento com a coleção, a origem (URL do post, caminho
+do arquivo ou, nas imagens enviadas à API, `sha256:` + hash do conteúdo), a
+posição no carrossel, o nome da imagem, a legenda e o texto. A tabela `documents` guarda os dados e a tabela virtual
+`documents_fts` (conteúdo externo, mantida por gatilhos) indexa texto e
+legenda, sem acentos e sem diferenciar maiúsculas, para que "informação"
+também encontre "informacao".
+
+- `search` ordena por relevância (BM25) e devolve um trecho com os termos
+  destacados; a página é limitada a `SEARCH_MAX_LIMIT` resultados;
+- `list_documents` pagina por cursor (o id do último documento), então a
+  página 10.000 custa o mesmo que a primeira, mesmo com milhões de slides;
+- `collections` lê contadores mantidos por gatilhos, sem varrer os documentos;
+- Reprocessar a mesma origem na mesma coleção substitui o documento
+  (chave única coleção + origem + posição), em vez de duplicá-lo.
+
+O banco fica em `TEXT_INDEX_DB` (padrão: junto do cache de OCR, em ~/.cache/vx9);
+`TEXT_INDEX_DB=""` desliga o índice.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+TEXT_INDEX_DB = os.getenv("TEXT_INDEX_DB", str(Path.home() / ".cache" / "vx9" / "text_index.sqlite3"))
+SEARCH_MAX_LIMIT = 100
+
+# Marcadores do trecho destacado e número de palavras em volta dos termos encontrados
+HIGHLIGHT = ('<mark>', '</mark>')
+SNIPPET_WORDS = 16
+
+# (origem, posição, imagem, legenda, texto)
+IndexEntry = Tuple[str, int, str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    source TEXT NOT NULL,
+    item_order INTEGER NOT NULL,
+    image TEXT NOT NULL DEFAULT '',
+    caption TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    UNIQUE (collection, source, item_order)
+);
+CREATE INDEX IF NOT EXISTS documents_by_collection ON documents (collection, id);
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    items INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    text, caption, content='documents', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, text, caption) VALUES (new.id, new.text, new.caption);
+    INSERT INTO collections (name, items, updated_at) VALUES (new.collection, 1, new.indexed_at)
+        ON CONFLICT (name) DO UPDATE SET items = items + 1, updated_at = excluded.updated_at;
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, text, caption) VALUES ('delete', old.id, old.text, old.caption);
+    UPDATE collections SET items = items - 1 WHERE name = old.collection;
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, text, caption) VALUES ('delete', old.id, old.text, old.caption);
+    INSERT INTO documents_fts (rowid, text, caption) VALUES (new.id, new.text, new.caption);
+    UPDATE collections SET updated_at = new.indexed_at WHERE name = new.collection;
+END;
+"""
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def match_query(query: str) -> str:
+    """
+    Converte a busca digitada pelo usuário em uma expressão FTS5 segura: cada
+    palavra (ou "frase entre aspas") precisa aparecer no documento, e uma palavra
+    terminada em `*` busca por prefixo. Operadores e pontuação do FTS5 perdem o
+    significado especial, então nenhuma busca causa erro de sintaxe.
+    """
+    terms = []
+    for phrase, word in _TERM_RE.findall(query):
+        prefix = False
+        if word:
+            prefix = word.endswith('*')
+            phrase = word.rstrip('*')
+        phrase = phrase.strip()
+        if phrase:
+            terms.append('"' + phrase.replace('"', '""') + '"' + ('*' if prefix else ''))
+    if not terms:
+        raise ValueError("Busca vazia.")
+    return ' '.join(terms)
+
+
+def _document(row, text_field: str = 'text') -> dict:
+    return {
+        "id": row[0],
+        "collection": row[1],
+        "source": row[2],
+        "order": row[3],
+        "image": row[4],
+        "caption": row[5],
+        text_field: row[6],
+        "indexedAt": row[7],
+    }
+
+
+class TextIndex:
+    """
+    Índice persistente de textos extraídos. Seguro para uso a partir de várias threads.
+    """
+
+    def __init__(self, db_path: str = TEXT_INDEX_DB):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def add_many(self, collection: str, entries: Iterable[IndexEntry]) -> int:
+        """
+        Indexa (ou substitui) os documentos de uma coleção em uma única transação.
+        Documentos sem texto são ignorados. Retorna o número de documentos gravados.
+        """
+        now = time.time()
+        rows = [
+            (collection, source, order, image or '', caption or '', text, now)
+            for source, order, image, caption, text in entries
+            if text and text.strip()
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO documents (collection, source, item_order, image, caption, text, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (collection, source, item_order) DO UPDATE SET "
+                    "image = excluded.image, caption = excluded.caption, text = excluded.text, "
+                    "indexed_at = excluded.indexed_at",
+                    rows
+                )
+        return len(rows)
+
+    def search(self, query: str, collection: Optional[str] = None, limit: int = 20, offset: int = 0) -> dict:
+        """
+        Busca `query` (ver `match_query`) no texto e na legenda, do mais ao menos
+        relevante. Retorna {"results": [...], "hasMore": bool}; cada resultado traz
+        o trecho com os termos destacados (`snippet`) em vez do texto inteiro.
+        """
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+        sql = (
+            "SELECT d.id, d.collection, d.source, d.item_order, d.image, d.caption, "
+            "snippet(documents_fts, -1, ?, ?, '…', ?), d.indexed_at, bm25(documents_fts) AS score "
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ?"
+        )
+        params = [HIGHLIGHT[0], HIGHLIGHT[1], SNIPPET_WORDS, match_query(query)]
+        if collection:
+            sql += " AND d.collection = ?"
+            params.append(collection)
+        # Uma linha a mais indica se existe a próxima página, sem contar todos os resultados
+        sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params += [limit + 1, max(0, offset)]
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        results = []
+        for row in rows[:limit]:
+            result = _document(row, 'snippet')
+            # O BM25 do SQLite é negativo (quanto menor, mais relevante)
+            result["score"] = round(-row[8], 6)
+            results.append(result)
+        return {"results": results, "hasMore": len(rows) > limit}
+
+    def list_documents(self, collection: Optional[str] = None, limit: int = 50,
+                       cursor: Optional[int] = None) -> dict:
+        """
+        Lista os documentos do mais recente ao mais antigo. `cursor` é o
+        `nextCursor` da página anterior. Retorna {"documents": [...], "nextCursor"}.
+        """
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+        sql = "SELECT id, collection, source, item_order, image, caption, text, indexed_at FROM documents"
+        conditions, params = [], []
+        if collection:
+            conditions.append("collection = ?")
+            params.append(collection)
+        if cursor is not None:
+            conditions.append("id < ?")
+            params.append(cursor)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        documents = [_document(row) for row in rows[:limit]]
+        next_cursor = documents[-1]["id"] if len(rows) > limit else None
+        return {"documents": documents, "nextCursor": next_cursor}
+
+    def collections(self) -> List[dict]:
+        """
+        Coleções com o número de documentos e o momento da última indexação, da mais recente à mais antiga.
+        """
+        # Os contadores são mantidos pelos gatilhos: não há COUNT(*) sobre milhões de linhas
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, items, updated_at FROM collections WHERE items > 0 ORDER BY updated_at DESC"
+            ).fetchall()
+        return [{"name": name, "items": items, "updatedAt": updated_at} for name, items, updated_at in rows]
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
+
+
+def open_text_index() -> Optional[TextIndex]:
+    """
+    Abre o índice configurado em `TEXT_INDEX_DB`, ou retorna None se estiver desligado.
+    """
+    return TextIndex(TEXT_INDEX_DB) if TEXT_INDEX_DB else None
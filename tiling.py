@@ -0,0 +1,137 @@
+"""
+Detecção de regiões de texto e OCR em faixas paralelas para imagens muito altas.
+
+Prints longos e carrosséis emendados podem ter milhares de pixels de altura.
+Em vez de enviar a imagem inteira a um único processo do Tesseract, o perfil
+de projeção horizontal localiza as faixas com texto; elas são agrupadas em
+até `parts` tiras, cortadas apenas nos espaços em branco entre linhas (nenhuma
+linha é partida ao meio) e recortadas nas margens pelo perfil de colunas.
+Cada tira é reconhecida em paralelo e os textos são reunidos de cima para baixo.
+
+Configuração: `OCR_TILING=0` desliga o modo; `OCR_TILE_MIN_HEIGHT` e
+`OCR_TILE_MIN_ASPECT` definem a partir de quando uma imagem é dividida.
+"""
+
+import io
+import math
+import os
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from metrics import stage
+from ocr_engine import ocr_source
+from preprocessing import ink_mask, load_gray, text_row_bands
+
+OCR_TILING = os.getenv("OCR_TILING", "1") not in ("0", "false", "no")
+OCR_TILE_MIN_HEIGHT = int(os.getenv("OCR_TILE_MIN_HEIGHT", 2400))
+OCR_TILE_MIN_ASPECT = float(os.getenv("OCR_TILE_MIN_ASPECT", 2.5))
+# Margem (em pixels) mantida em volta de cada tira
+TILE_PADDING = 12
+
+Box = Tuple[int, int, int, int]
+
+
+def image_size(source: Union[bytes, str, os.PathLike]) -> Tuple[int, int]:
+    """
+    Lê apenas o cabeçalho da imagem para obter (largura, altura), sem decodificar os pixels.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with Image.open(source) as img:
+            return img.size
+    with Image.open(io.BytesIO(source)) as img:
+        return img.size
+
+
+def should_tile(size: Tuple[int, int]) -> bool:
+    if not OCR_TILING:
+        return False
+    width, height = size
+    return height >= OCR_TILE_MIN_HEIGHT or (height >= OCR_TILE_MIN_HEIGHT / 2 and height / max(1, width) >= OCR_TILE_MIN_ASPECT)
+
+
+def plan_tiles(gray: np.ndarray, parts: int) -> List[Box]:
+    """
+    Calcula as caixas (esquerda, topo, direita, base) das tiras com texto, em ordem de leitura.
+    """
+    ink = ink_mask(gray)
+    bands = text_row_bands(ink)
+    if len(bands) == 0:
+        return []
+
+    # Agrupa faixas consecutivas até a altura alvo, cortando só entre faixas
+    span = bands[-1][1] - bands[0][0]
+    target = max(1, math.ceil(span / max(1, parts)))
+    groups = []
+    start, end = bands[0]
+    for band_start, band_end in bands[1:]:
+        if band_end - start > target:
+            groups.append((start, end))
+            start = band_start
+        end = band_end
+    groups.append((start, end))
+
+    height, width = gray.shape
+    boxes = []
+    for idx, (top, bottom) in enumerate(groups):
+        # A margem nunca invade a tira vizinha: no máximo até o meio do espaço entre elas
+        upper_limit = 0 if idx == 0 else (groups[idx - 1][1] + top) // 2
+        lower_limit = height if idx == len(groups) - 1 else (bottom + groups[idx + 1][0]) // 2
+        top = max(upper_limit, top - TILE_PADDING)
+        bottom = min(lower_limit, bottom + TILE_PADDING)
+
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        if columns.size == 0:
+            continue
+        left = max(0, int(columns[0]) - TILE_PADDING)
+        right = min(width, int(columns[-1]) + 1 + TILE_PADDING)
+        boxes.append((left, int(top), right, int(bottom)))
+    return boxes
+
+
+def split_image_regions(source: Union[bytes, str, os.PathLike, Image.Image],
+                        parts: int) -> Tuple[List[Tuple[bytes, Box]], Tuple[float, float]]:
+    """
+    Como `split_image`, mas devolve também a caixa de cada tira e a escala
+    (largura, altura) da imagem original em relação à usada no corte, que difere
+    quando um JPEG grande é decodificado já reduzido. Com isso as caixas das
+    palavras de cada tira voltam para as coordenadas da imagem inteira.
+    """
+    with stage('split'):
+        img = load_gray(source)
+        original_size = source.size if isinstance(source, Image.Image) else image_size(source)
+        gray = np.asarray(img)
+        tiles = []
+        for box in plan_tiles(gray, parts):
+            buffer = io.BytesIO()
+            img.crop(box).save(buffer, format='PPM')
+            tiles.append((buffer.getvalue(), box))
+    return tiles, (original_size[0] / img.size[0], original_size[1] / img.size[1])
+
+
+def split_image(source: Union[bytes, str, os.PathLike, Image.Image], parts: int) -> List[bytes]:
+    """
+    Divide a imagem em até `parts` tiras com texto e as devolve como PGM sem compressão.
+    Uma imagem sem texto resulta em lista vazia.
+    """
+    tiles, _ = split_image_regions(source, parts)
+    return [tile for tile, _ in tiles]
+
+
+def join_tiles(texts: List[str]) -> str:
+    return '\n'.join(text.strip() for text in texts if text and text.strip())
+
+
+def ocr_tiled(source: Union[bytes, str, os.PathLike], executor: Executor, parts: int,
+              lang: str = 'por', engine=None) -> Optional[str]:
+    """
+    Reconhece uma imagem alta dividindo-a em tiras processadas em paralelo no `executor`.
+    Retorna None se a imagem não precisar ser dividida (o chamador segue o caminho normal).
+    """
+    if not should_tile(image_size(source)):
+        return None
+    tiles = split_image(source, parts)
+    texts = list(executor.map(lambda tile: ocr_source(tile, lang=lang, engine=engine), tiles))
+    return join_tiles(texts)
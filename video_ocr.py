@@ -0,0 +1,367 @@
+"""
+OCR de vídeos (TikTok, Reels) por amostragem de quadros.
+
+Boa parte do texto desses vídeos está queimada na imagem (legendas). Em vez
+de reconhecer centenas de quadros:
+
+1. O `ffmpeg` decodifica o vídeo já reduzido e em tons de cinza, a
+   `VIDEO_SAMPLE_FPS` quadros por segundo, lidos um a um do stdout (memória constante);
+2. Cada quadro é comparado com o início do trecho estável atual só na região
+   de texto de uma miniatura: pixels junto a bordas fortes que ficam parados
+   entre amostras e não acompanham o movimento da câmera (estimado por
+   correlação de fase em blocos). Panorâmicas, zoom e fundos em movimento não
+   abrem trechos novos; enquanto a fração da região de texto que mudou fica
+   abaixo de `VIDEO_SCENE_THRESHOLD`, o texto não mudou e o quadro é
+   descartado. Trechos vazios (sem "tinta") não vão para o OCR;
+3. Só o último quadro de cada trecho estável vai para o OCR (em lote);
+4. Trechos consecutivos com o mesmo texto (ou quase, pela variação do OCR)
+   são unidos em um segmento com início e fim.
+
+O resultado é uma lista de segmentos `{"start", "end", "text"}`, em segundos.
+"""
+
+import json
+import os
+import re
+import subprocess
+from difflib import SequenceMatcher
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import is_blank
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+VIDEO_SAMPLE_FPS = float(os.getenv("VIDEO_SAMPLE_FPS", 2))
+VIDEO_FRAME_WIDTH = int(os.getenv("VIDEO_FRAME_WIDTH", 720))
+VIDEO_SCENE_THRESHOLD = float(os.getenv("VIDEO_SCENE_THRESHOLD", 0.3))
+VIDEO_TEXT_SIMILARITY = float(os.getenv("VIDEO_TEXT_SIMILARITY", 0.85))
+
+# Largura da miniatura usada na comparação entre quadros e contraste mínimo de uma borda
+DIFF_WIDTH = 360
+EDGE_DELTA = 64
+# Variação máxima de um pixel "parado" entre duas amostras (ruído de compressão)
+# e variação mínima de um pixel de texto que mudou
+STILL_DELTA = 20
+CHANGE_DELTA = 40
+# Grade de blocos em que o deslocamento da câmera é estimado e fração mínima de
+# pixels que o deslocamento precisa explicar para ser considerado movimento
+MOTION_TILES = 4
+MOTION_MIN = 0.01
+# Limites da área de texto usada como denominador na comparação, em fração da miniatura
+TEXT_AREA_MIN = 0.002
+TEXT_AREA_MAX = 0.015
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.webm', '.mkv', '.m4v')
+
+
+class VideoDecodeError(RuntimeError):
+    pass
+
+
+def signature() -> str:
+    """
+    Descreve os parâmetros da amostragem, para compor as chaves do cache.
+    """
+    return f"video:f{VIDEO_SAMPLE_FPS}:w{VIDEO_FRAME_WIDTH}:d{VIDEO_SCENE_THRESHOLD}:t{VIDEO_TEXT_SIMILARITY}"
+
+
+def probe_size(path) -> Tuple[int, int]:
+    """
+    Largura e altura do primeiro fluxo de vídeo, via ffprobe.
+    """
+    try:
+        completed = subprocess.run(
+            [FFPROBE_BIN, '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'stream=width,height', '-of', 'json', os.fspath(path)],
+            capture_output=True, timeout=60,
+        )
+    except FileNotFoundError:
+        raise VideoDecodeError(f"{FFPROBE_BIN} não encontrado. Instale o ffmpeg e adicione-o ao PATH.")
+    if completed.returncode != 0:
+        raise VideoDecodeError(completed.stderr.decode('utf-8', 'replace').strip() or "ffprobe falhou")
+    streams = json.loads(completed.stdout or b'{}').get('streams') or []
+    if not streams:
+        raise VideoDecodeError("O arquivo não contém um fluxo de vídeo.")
+    return int(streams[0]['width']), int(streams[0]['height'])
+
+
+def iter_frames(path, fps: float = VIDEO_SAMPLE_FPS, width: int = VIDEO_FRAME_WIDTH) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Gera pares (instante em segundos, quadro em tons de cinza) amostrados a `fps`
+    quadros por segundo, com no máximo `width` pixels de largura.
+    """
+    src_width, src_height = probe_size(path)
+    width = min(width, src_width)
+    # Dimensões pares, como o ffmpeg exige para a maioria dos formatos
+    width -= width % 2
+    height = max(2, round(src_height * width / src_width))
+    height -= height % 2
+    frame_size = width * height
+
+    process = subprocess.Popen(
+        [FFMPEG_BIN, '-v', 'error', '-nostdin', '-i', os.fspath(path),
+         '-vf', f'fps={fps},scale={width}:{height}', '-f', 'rawvideo', '-pix_fmt', 'gray', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    try:
+        index = 0
+        while True:
+            data = process.stdout.read(frame_size)
+            if len(data) < frame_size:
+                break
+            yield index / fps, np.frombuffer(data, dtype=np.uint8).reshape(height, width)
+            index += 1
+    finally:
+        process.stdout.close()
+        process.kill()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        process.wait()
+    if index == 0 and stderr:
+        raise VideoDecodeError(stderr.decode('utf-8', 'replace').strip())
+
+
+def _thumbnail(frame: np.ndarray) -> np.ndarray:
+    step = max(1, frame.shape[1] // DIFF_WIDTH)
+    return frame[::step, ::step].astype(np.int16)
+
+
+def _grow(mask: np.ndarray) -> np.ndarray:
+    """
+    Dilatação 3x3 de uma máscara.
+    """
+    grown = mask.copy()
+    grown[1:, :] |= mask[:-1, :]
+    grown[:-1, :] |= mask[1:, :]
+    rows = grown.copy()
+    grown[:, 1:] |= rows[:, :-1]
+    grown[:, :-1] |= rows[:, 1:]
+    return grown
+
+
+def _strong_edges(thumb: np.ndarray) -> np.ndarray:
+    """
+    Pixels dos dois lados de uma transição de alto contraste (contorno de letras).
+    """
+    edges = np.zeros(thumb.shape, dtype=bool)
+    dx = np.abs(np.diff(thumb, axis=1)) > EDGE_DELTA
+    dy = np.abs(np.diff(thumb, axis=0)) > EDGE_DELTA
+    edges[:, 1:] |= dx
+    edges[:, :-1] |= dx
+    edges[1:, :] |= dy
+    edges[:-1, :] |= dy
+    return edges
+
+
+def _shift(a: np.ndarray, b: np.ndarray) -> Tuple[int, int]:
+    """
+    Deslocamento (linhas, colunas) que leva `b` a `a`, por correlação de fase.
+    Deslocamentos de até um pixel são ignorados: o pico em zero é o do conteúdo parado.
+    """
+    cross = np.fft.rfft2(a - a.mean()) * np.conj(np.fft.rfft2(b - b.mean()))
+    cross /= np.abs(cross) + 1e-9
+    correlation = np.fft.irfft2(cross, s=a.shape)
+    correlation[np.ix_((-1, 0, 1), (-1, 0, 1))] = -1
+    peak = np.unravel_index(np.argmax(correlation), correlation.shape)
+    return tuple(int(p) if p <= n // 2 else int(p) - n for p, n in zip(peak, correlation.shape))
+
+
+def _motion(a: np.ndarray, b: np.ndarray, still: np.ndarray):
+    """
+    Pixels de `a` e de `b` que coincidem com a outra amostra deslocada pelo
+    movimento estimado, ou None se o deslocamento não explica quase nada (sem movimento).
+    """
+    dy, dx = _shift(a, b)
+    moved_a = np.abs(a - np.roll(b, (dy, dx), axis=(0, 1))) <= STILL_DELTA
+    if np.count_nonzero(moved_a & ~still) < MOTION_MIN * a.size:
+        return None
+    moved_b = np.abs(b - np.roll(a, (-dy, -dx), axis=(0, 1))) <= STILL_DELTA
+    return moved_a, moved_b
+
+
+def _compare_samples(a: np.ndarray, b: np.ndarray):
+    """
+    Compara duas amostras consecutivas. Retorna (parados, acompanham o movimento
+    em `a`, acompanham o movimento em `b`). O movimento é estimado em uma grade
+    de `MOTION_TILES` x `MOTION_TILES` blocos, para cobrir zoom e paralaxe além
+    de panorâmicas. Fundo liso ou bordas paralelas ao movimento parecem parados,
+    mas também coincidem com a amostra deslocada e assim são reconhecidos como fundo.
+    """
+    still = np.abs(a - b) <= STILL_DELTA
+    moved_a = np.zeros(a.shape, dtype=bool)
+    moved_b = np.zeros(a.shape, dtype=bool)
+    rows = np.linspace(0, a.shape[0], MOTION_TILES + 1).astype(int)
+    cols = np.linspace(0, a.shape[1], MOTION_TILES + 1).astype(int)
+    for y0, y1 in zip(rows, rows[1:]):
+        for x0, x1 in zip(cols, cols[1:]):
+            tile = np.s_[y0:y1, x0:x1]
+            moved = _motion(a[tile], b[tile], still[tile])
+            if moved is not None:
+                moved_a[tile], moved_b[tile] = moved
+    return still, moved_a, moved_b
+
+
+def _text_mask(thumb: np.ndarray, still: np.ndarray) -> np.ndarray:
+    """
+    Pixels parados junto a bordas fortes, em blocos de pelo menos 2x2 (pontos
+    isolados que ficaram parados por acaso, como em ruído, não contam).
+    """
+    candidate = _grow(_strong_edges(thumb)) & still
+    block = candidate[:-1, :-1] & candidate[1:, :-1] & candidate[:-1, 1:] & candidate[1:, 1:]
+    mask = np.zeros(thumb.shape, dtype=bool)
+    mask[:-1, :-1] |= block
+    mask[1:, :-1] |= block
+    mask[:-1, 1:] |= block
+    mask[1:, 1:] |= block
+    return mask
+
+
+def text_signatures(frames):
+    """
+    Para cada quadro, gera (instante, quadro, assinatura). A assinatura é a
+    miniatura, a máscara da região de texto e os pixels que mudaram desde a
+    amostra anterior. Legenda queimada fica parada enquanto a câmera se move,
+    então a região de texto são os pixels junto a bordas fortes que não mudaram
+    em relação à amostra anterior ou à seguinte e que não acompanham o movimento
+    da cena. Por isso cada quadro só é gerado depois da leitura do seguinte.
+    """
+    pending = None
+    for timestamp, frame in frames:
+        thumb = _thumbnail(frame)
+        if pending is None:
+            none = np.zeros(thumb.shape, dtype=bool)
+            pending = (timestamp, frame, thumb, none, none)
+            continue
+        previous_time, previous_frame, previous_thumb, still_before, moved_before = pending
+        still, moved, moved_previous = _compare_samples(thumb, previous_thumb)
+        mask = _text_mask(previous_thumb, (still_before | still) & ~(moved_before | moved_previous))
+        yield previous_time, previous_frame, (previous_thumb, mask, ~still_before)
+        pending = (timestamp, frame, thumb, still, moved)
+    if pending is not None:
+        timestamp, frame, thumb, still_before, moved_before = pending
+        yield timestamp, frame, (thumb, _text_mask(thumb, still_before & ~moved_before), ~still_before)
+
+
+def frame_difference(reference, current) -> float:
+    """
+    Fração da região de texto (das duas assinaturas) que mudou de uma vez entre
+    a referência e o quadro atual (0 = mesmo texto, 1 = texto diferente). Um pixel
+    só conta se também mudou desde a amostra anterior: legendas trocam de uma
+    amostra para a outra, enquanto um fundo que se move devagar muda aos poucos.
+    """
+    (ref_thumb, ref_mask, _), (thumb, mask, jumped) = reference, current
+    region = ref_mask | mask
+    changed = np.count_nonzero(region & jumped & (np.abs(thumb - ref_thumb) > CHANGE_DELTA))
+    # Piso: poucos pixels soltos não são mudança de texto; teto: um cenário parado
+    # cheio de bordas não dilui a troca de uma legenda
+    area = min(max(np.count_nonzero(region), TEXT_AREA_MIN * thumb.size), TEXT_AREA_MAX * thumb.size)
+    return min(1.0, changed / max(area, 1))
+
+
+def distinct_frames(frames, threshold: float = VIDEO_SCENE_THRESHOLD):
+    """
+    Agrupa os quadros em trechos estáveis e gera, para cada trecho com conteúdo,
+    (início, fim, último quadro do trecho). O último quadro é o escolhido porque
+    legendas costumam surgir com animação e só ficam completas no fim do trecho.
+    """
+    start = end = None
+    reference = None
+    last = None
+    for timestamp, frame, current in text_signatures(frames):
+        if reference is not None and frame_difference(reference, current) <= threshold:
+            end = timestamp
+            last = frame
+            continue
+        if last is not None and not is_blank(last):
+            yield start, end, last
+        start = end = timestamp
+        reference = current
+        last = frame
+    if last is not None and not is_blank(last):
+        yield start, end, last
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\W+', ' ', text.lower()).strip()
+
+
+def merge_segments(segments: List[dict], similarity: float = VIDEO_TEXT_SIMILARITY) -> List[dict]:
+    """
+    Remove segmentos sem texto e une os consecutivos cujo texto é igual ou quase
+    igual (razão de similaridade >= `similarity`), mantendo a versão mais longa.
+    """
+    merged = []
+    for segment in segments:
+        normalized = _normalize(segment['text'])
+        if not normalized:
+            continue
+        if merged:
+            previous = merged[-1]
+            previous_normalized = _normalize(previous['text'])
+            if (normalized == previous_normalized
+                    or SequenceMatcher(None, normalized, previous_normalized).ratio() >= similarity):
+                previous['end'] = segment['end']
+                if len(segment['text']) > len(previous['text']):
+                    previous['text'] = segment['text']
+                    previous['frame'] = segment['frame']
+                continue
+        merged.append(dict(segment))
+    return merged
+
+
+def ocr_video(path, lang: str = 'por', engine=None, fps: float = VIDEO_SAMPLE_FPS,
+              frames_dir: Optional[str] = None) -> dict:
+    """
+    Extrai os segmentos de texto do vídeo. Com `frames_dir`, o quadro de cada
+    segmento é salvo como PNG (`frame_0001.png`, ...) e o caminho vai no campo `image`.
+
+    Retorna {"segments": [...], "frames_sampled": n, "frames_ocr": n}.
+    """
+    from ocr_engine import OCR_BULK_SIZE, ocr_sources
+
+    sampled = 0
+
+    def counted(frames):
+        nonlocal sampled
+        for item in frames:
+            sampled += 1
+            yield item
+
+    segments = []
+    batch = []
+
+    def flush():
+        texts = ocr_sources([Image.fromarray(frame) for _, _, frame in batch], lang=lang, engine=engine)
+        for (start, end, frame), text in zip(batch, texts):
+            if isinstance(text, Exception):
+                raise text
+            segments.append({'start': start, 'end': end + 1.0 / fps, 'text': text.strip(), 'frame': frame})
+        batch.clear()
+
+    frames_ocr = 0
+    for item in distinct_frames(counted(iter_frames(path, fps))):
+        batch.append(item)
+        frames_ocr += 1
+        if len(batch) >= OCR_BULK_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    merged = merge_segments(segments)
+    for number, segment in enumerate(merged, start=1):
+        frame = segment.pop('frame')
+        segment['start'] = round(segment['start'], 2)
+        segment['end'] = round(segment['end'], 2)
+        if frames_dir is not None:
+            image_path = os.path.join(frames_dir, f"frame_{number:04d}.png")
+            Image.fromarray(frame).save(image_path)
+            segment['image'] = image_path
+    return {'segments': merged, 'frames_sampled': sampled, 'frames_ocr': frames_ocr}
+
+
+def format_timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:05.2f}"